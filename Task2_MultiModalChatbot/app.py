@@ -1,4 +1,6 @@
 import os
+import sys
+import time
 import base64
 from io import BytesIO
 from datetime import datetime
@@ -9,8 +11,11 @@ from PIL import Image
 from dotenv import load_dotenv
 import requests
 
-# Official Gemini SDK
-import google.generativeai as genai
+# Offline stand-in that replays chunked responses (FAKE_GEMINI=1), shared with Task 3 from shared/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.fake_gemini import FakeGenerativeModel
+from image_prep import prepare_image
+from image_store import DescriptionCache, ImageStore, image_key
 
 # -------------------- PAGE CONFIG --------------------
 st.set_page_config(
@@ -23,12 +28,30 @@ st.set_page_config(
 load_dotenv()
 API_KEY = os.getenv("GOOGLE_API_KEY")
 
-if not API_KEY:
-    st.error("GOOGLE_API_KEY not found in .env. Add: GOOGLE_API_KEY=your_key")
-    st.stop()
+if os.getenv("FAKE_GEMINI"):
+    MODEL_TEXT_VISION = FakeGenerativeModel()
+else:
+    if not API_KEY:
+        st.error("GOOGLE_API_KEY not found in .env. Add: GOOGLE_API_KEY=your_key")
+        st.stop()
 
-genai.configure(api_key=API_KEY)
-MODEL_TEXT_VISION = genai.GenerativeModel("gemini-1.5-flash")
+    # Official Gemini SDK, only needed when talking to the real API
+    import google.generativeai as genai
+    genai.configure(api_key=API_KEY)
+    MODEL_TEXT_VISION = genai.GenerativeModel("gemini-1.5-flash")
+
+# Uploaded images live on disk by content hash; session state only keeps their keys
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "image_store"))
+IMAGE_STORE_MAX_ITEMS = int(os.getenv("IMAGE_STORE_MAX_ITEMS", "500"))
+THUMBNAIL_SIZE = 512
+
+@st.cache_resource
+def get_image_store() -> ImageStore:
+    return ImageStore(IMAGE_STORE_DIR, thumb_size=THUMBNAIL_SIZE, max_items=IMAGE_STORE_MAX_ITEMS)
+
+@st.cache_resource
+def get_description_cache() -> DescriptionCache:
+    return DescriptionCache()
 
 # -------------------- STYLES --------------------
 CUSTOM_CSS = """
@@ -98,6 +121,7 @@ with st.sidebar:
     - If Gemini image generation fails, the app uses a free fallback provider.
     - Sidebar can be collapsed with the arrow ⬅️ for more space.
     """)
+    STREAM_RESPONSES = st.toggle("Stream responses", value=True, help="Show Gemini's answer as it is generated")
 
 # -------------------- STATE --------------------
 def ensure_states():
@@ -119,18 +143,33 @@ def ts() -> str:
 def b64_to_pil(b64_png: str) -> Image.Image:
     return Image.open(BytesIO(base64.b64decode(b64_png)))
 
-def render_pair(user_text: str, bot_text: str):
+def format_bytes(n: int) -> str:
+    return f"{n / 1024 / 1024:.1f} MB" if n >= 1024 * 1024 else f"{n / 1024:.0f} KB"
+
+def latency_note(metrics: dict | None) -> str:
+    if metrics and metrics.get("cached"):
+        return '<div class="small-note">⚡ cached description (no Gemini call)</div>'
+    if not metrics or metrics.get("total") is None:
+        return ""
+    note = f'⏱️ first token {metrics["ttft"]:.2f}s • total {metrics["total"]:.2f}s'
+    if metrics.get("upload"):
+        upload = metrics["upload"]
+        note += f' • 📦 sent {format_bytes(upload["sent_bytes"])} of {format_bytes(upload["original_bytes"])}'
+    return f'<div class="small-note">{note}</div>'
+
+def render_pair(user_text: str, bot_text: str, metrics: dict | None = None):
     st.markdown('<div class="chat-pair">', unsafe_allow_html=True)
     st.markdown(f'<div class="msg-user"><b>You</b><br>{user_text}</div>', unsafe_allow_html=True)
-    st.markdown(f'<div class="msg-bot"><b>Bot</b><br>{bot_text}</div>', unsafe_allow_html=True)
+    st.markdown(f'<div class="msg-bot"><b>Bot</b><br>{bot_text}</div>{latency_note(metrics)}', unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
-def render_image_pair(img: Image.Image, user_text: str | None, bot_text: str):
+def render_image_pair(img: Image.Image | str, user_text: str | None, bot_text: str, metrics: dict | None = None):
     st.markdown('<div class="chat-pair">', unsafe_allow_html=True)
     if user_text:
         st.markdown(f'<div class="msg-user"><b>You</b><br>{user_text}</div>', unsafe_allow_html=True)
-    st.image(img, use_container_width=True)
-    st.markdown(f'<div class="msg-bot"><b>Bot</b><br>{bot_text}</div>', unsafe_allow_html=True)
+    # Thumbnail paths are shown at their own size; stretching them would only blur them
+    st.image(img, use_container_width=not isinstance(img, str))
+    st.markdown(f'<div class="msg-bot"><b>Bot</b><br>{bot_text}</div>{latency_note(metrics)}', unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
 def render_generated(prompt: str, image_src: str, src_type: str):
@@ -144,20 +183,55 @@ def render_generated(prompt: str, image_src: str, src_type: str):
     st.markdown('</div>', unsafe_allow_html=True)
 
 # -------------------- CORE (Gemini) --------------------
-def generate_text_response(user_text: str) -> str:
+def generate_text_response(user_text: str, metrics: dict | None = None) -> str:
+    start = time.perf_counter()
     resp = MODEL_TEXT_VISION.generate_content(user_text)
+    if metrics is not None:
+        metrics["ttft"] = metrics["total"] = time.perf_counter() - start
     return (resp.text or "").strip()
 
-def generate_image_description(image_file, prompt: str | None = None) -> str:
-    image = Image.open(image_file).convert("RGB")
-    parts = [image]
-    if prompt and prompt.strip():
-        parts.insert(0, prompt.strip())
-    else:
-        parts.insert(0, "Describe the image in detail: objects, scene, actions, and context.")
+DEFAULT_IMAGE_PROMPT = "Describe the image in detail: objects, scene, actions, and context."
+
+def image_prompt(prompt: str | None) -> str:
+    return prompt.strip() if prompt and prompt.strip() else DEFAULT_IMAGE_PROMPT
+
+def image_description_parts(image_bytes: bytes, prompt: str | None = None, metrics: dict | None = None) -> list:
+    # Downscaled/recompressed before sending; the upload size is what dominates latency for big photos
+    blob, info = prepare_image(image_bytes)
+    if metrics is not None:
+        metrics["upload"] = info
+    return [image_prompt(prompt), blob]
+
+def generate_image_description(image_bytes: bytes, prompt: str | None = None, metrics: dict | None = None) -> str:
+    parts = image_description_parts(image_bytes, prompt, metrics)
+    start = time.perf_counter()
     resp = MODEL_TEXT_VISION.generate_content(parts)
+    if metrics is not None:
+        metrics["ttft"] = metrics["total"] = time.perf_counter() - start
     return (resp.text or "").strip()
 
+def stream_gemini(contents, metrics: dict):
+    """Yield text chunks as Gemini generates them; fills metrics with time to first token and total latency."""
+    start = time.perf_counter()
+    metrics["ttft"] = metrics["total"] = None
+    for chunk in MODEL_TEXT_VISION.generate_content(contents, stream=True):
+        try:
+            text = chunk.text
+        except ValueError:  # e.g. a chunk that only carries safety ratings
+            continue
+        if not text:
+            continue
+        if metrics["ttft"] is None:
+            metrics["ttft"] = time.perf_counter() - start
+        yield text
+    metrics["total"] = time.perf_counter() - start
+
+def stream_text_response(user_text: str, metrics: dict):
+    return stream_gemini(user_text, metrics)
+
+def stream_image_description(image_bytes: bytes, prompt: str | None, metrics: dict):
+    return stream_gemini(image_description_parts(image_bytes, prompt, metrics), metrics)
+
 def try_gemini_image(prompt: str) -> str:
     resp = MODEL_TEXT_VISION.generate_content(
         prompt,
@@ -195,18 +269,25 @@ with tab1:
     msg = st.text_input("Message", key="conv_input", placeholder="Ask anything...")
     if st.button("Send", key="conv_send"):
         if msg and msg.strip():
+            metrics = {}
+            live = st.empty()
             try:
-                ans = generate_text_response(msg.strip())
+                if STREAM_RESPONSES:
+                    with live.container():
+                        ans = st.write_stream(stream_text_response(msg.strip(), metrics)).strip()
+                else:
+                    ans = generate_text_response(msg.strip(), metrics)
             except Exception as e:
                 ans = f"Error: {e}"
-            st.session_state.conv_history.append({"q": msg.strip(), "a": ans, "ts": ts()})
+            live.empty()  # The finished answer is shown in the history below
+            st.session_state.conv_history.append({"q": msg.strip(), "a": ans, "ts": ts(), "metrics": metrics})
         else:
             st.warning("Please type a message.")
 
     st.markdown("**History**")
     st.markdown('<div class="history-box">', unsafe_allow_html=True)
     for item in reversed(st.session_state.conv_history):
-        render_pair(item["q"], item["a"])
+        render_pair(item["q"], item["a"], item.get("metrics"))
     st.markdown('</div>', unsafe_allow_html=True)
 
     if st.button("Clear History", key="conv_clear"):
@@ -237,25 +318,51 @@ with tab2:
             st.warning("Please upload an image first.")
         else:
             raw_bytes = up.getvalue()
+            metrics = {}
+            live = st.empty()
+            cache = get_description_cache()
             try:
-                insight = generate_image_description(BytesIO(raw_bytes), prompt_insight.strip() if prompt_insight else None)
+                insight_prompt = prompt_insight.strip() if prompt_insight else None
+                cache_key = (image_key(raw_bytes), image_prompt(insight_prompt))
+                insight = cache.get(*cache_key, original_bytes=len(raw_bytes))
+                if insight is not None:
+                    metrics["cached"] = True
+                elif STREAM_RESPONSES:
+                    with live.container():
+                        insight = st.write_stream(
+                            stream_image_description(raw_bytes, insight_prompt, metrics)).strip()
+                else:
+                    insight = generate_image_description(raw_bytes, insight_prompt, metrics)
+                if not metrics.get("cached"):
+                    cache.put(*cache_key, insight)
+                    cache.record_upload(metrics["upload"]["original_bytes"], metrics["upload"]["sent_bytes"])
+                live.empty()
+                stored_key = get_image_store().put(raw_bytes)
                 st.session_state.insight_history.append({
                     "prompt": (prompt_insight.strip() if prompt_insight else None),
-                    "image_bytes": raw_bytes,
+                    "image_key": stored_key,
                     "a": insight,
-                    "ts": ts()
+                    "ts": ts(),
+                    "metrics": metrics
                 })
             except Exception as e:
+                live.empty()
                 st.error(f"Analysis failed: {e}")
 
+    cache_stats = get_description_cache().stats()
+    if cache_stats["hits"] or cache_stats["misses"]:
+        st.caption(f"📦 {format_bytes(cache_stats['bytes_saved'])} not uploaded • "
+                   f"cache hits {cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']}")
+
     st.markdown("**History**")
     st.markdown('<div class="history-box">', unsafe_allow_html=True)
+    store = get_image_store()
+    keys = [item["image_key"] for item in st.session_state.insight_history if item.get("image_key")]
+    store.touch(keys)  # images still in a session's history are the last to be evicted
     for item in reversed(st.session_state.insight_history):
-        try:
-            img = Image.open(BytesIO(item["image_bytes"]))
-        except Exception:
-            img = Image.new("RGB", (512, 320), color=(32, 32, 32))
-        render_image_pair(img, item["prompt"], item["a"])
+        thumbnail = store.thumbnail(item["image_key"]) if item.get("image_key") else None
+        img = thumbnail or Image.new("RGB", (512, 320), color=(32, 32, 32))
+        render_image_pair(img, item["prompt"], item["a"], item.get("metrics"))
     st.markdown('</div>', unsafe_allow_html=True)
 
     if st.button("Clear History", key="insight_clear"):
@@ -0,0 +1,86 @@
+"""Offline benchmarks for the multi-modal chatbot.
+
+Run from the Task2 folder, e.g.:
+    python benchmark.py upload --sizes 1024 2048 4000 --max-dimension 1024 --max-bytes 307200
+"""
+import argparse
+import os
+import sys
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from image_prep import prepare_image
+from image_store import DescriptionCache, image_key
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # for shared/
+from shared.fake_gemini import FakeGenerativeModel
+
+
+def photo_like(width: int, height: int, seed: int = 0) -> bytes:
+    """A JPEG with gradients plus noise, which compresses about as badly as a real photo."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([x * 255 / width, y * 255 / height, (x + y) * 127 / (width + height)], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 24, base.shape), 0, 255).astype(np.uint8)
+    out = BytesIO()
+    Image.fromarray(pixels).save(out, format="JPEG", quality=92)
+    return out.getvalue()
+
+
+def bench_upload(args):
+    """Bytes sent per image before/after prepare_image, and a repeated analysis with the description cache."""
+    # Upload time at a given bandwidth, so the byte savings read as latency
+    bytes_per_s = args.upload_mbit * 1e6 / 8
+    print(f"max dimension {args.max_dimension}px, byte budget {args.max_bytes / 1024:.0f} KB, "
+          f"upload at {args.upload_mbit} Mbit/s")
+    for size in args.sizes:
+        data = photo_like(size, size * 3 // 4)
+        start = time.perf_counter()
+        _, info = prepare_image(data, args.max_dimension, args.max_bytes)
+        prep_s = time.perf_counter() - start
+        print(f"  {size}x{size * 3 // 4}: {info['original_bytes'] / 1024:8.0f} KB -> {info['sent_bytes'] / 1024:6.0f} KB "
+              f"({info['sent_size'][0]}x{info['sent_size'][1]}), prep {prep_s * 1000:6.1f} ms, upload "
+              f"{info['original_bytes'] / bytes_per_s:5.2f}s -> {info['sent_bytes'] / bytes_per_s:5.2f}s")
+
+    model = FakeGenerativeModel(first_token_delay=args.model_delay, chunk_delay=0)
+    cache = DescriptionCache()
+    data = photo_like(args.sizes[-1], args.sizes[-1] * 3 // 4)
+    prompt = "Describe the image"
+    timings = []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        key = image_key(data)
+        if cache.get(key, prompt, original_bytes=len(data)) is None:
+            blob, info = prepare_image(data, args.max_dimension, args.max_bytes)
+            cache.put(key, prompt, model.generate_content([prompt, blob]).text)
+            cache.record_upload(info["original_bytes"], info["sent_bytes"])
+        timings.append(time.perf_counter() - start)
+    stats = cache.stats()
+    print(f"same image + prompt analysed {args.repeats}x (fake model, {args.model_delay:.2f}s per call)")
+    print(f"  first call {timings[0] * 1000:8.1f} ms, cached calls {np.mean(timings[1:]) * 1000:8.3f} ms on average")
+    print(f"  cache hits {stats['hits']}/{stats['hits'] + stats['misses']}, "
+          f"{stats['bytes_saved'] / 1024 / 1024:.1f} MB not uploaded, {stats['bytes_sent'] / 1024:.0f} KB sent")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    upload = sub.add_parser("upload", help="upload bytes saved by downscaling, and description cache hits")
+    upload.add_argument("--sizes", type=int, nargs="+", default=[1024, 2048, 4000], help="image widths (4:3)")
+    upload.add_argument("--max-dimension", type=int, default=1024)
+    upload.add_argument("--max-bytes", type=int, default=300 * 1024)
+    upload.add_argument("--upload-mbit", type=float, default=10.0, help="assumed upload bandwidth")
+    upload.add_argument("--model-delay", type=float, default=0.3, help="fake model latency per call")
+    upload.add_argument("--repeats", type=int, default=5)
+    upload.set_defaults(func=bench_upload)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# Gemini doesn't need more than about 1k pixels per side to describe a photo; uploads beyond
+# that only add upload time
+MAX_IMAGE_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1024"))
+MAX_IMAGE_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(300 * 1024)))
+JPEG_QUALITIES = (85, 75, 65, 50)
+# Formats Gemini accepts as they are; anything else (GIF, BMP, ...) is always sent as JPEG
+MODEL_MIME_TYPES = ("image/jpeg", "image/png", "image/webp")
+
+
+def _encode_jpeg(image: Image.Image, quality: int) -> bytes:
+    out = BytesIO()
+    image.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def _to_rgb(image: Image.Image) -> Image.Image:
+    """RGB copy for JPEG; transparent areas become white instead of JPEG's default black."""
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        return Image.alpha_composite(Image.new("RGBA", image.size, (255, 255, 255, 255)), image).convert("RGB")
+    return image.convert("RGB")
+
+
+def prepare_image(data: bytes, max_dimension: int = MAX_IMAGE_DIMENSION,
+                  max_bytes: int = MAX_IMAGE_BYTES) -> tuple[dict, dict]:
+    """Shrink an upload to what the model needs before sending it.
+
+    Returns `(blob, info)`. `blob` is a `{"mime_type", "data"}` part for `generate_content`.
+    Images that already fit both `max_dimension` and `max_bytes` are sent unchanged. Others
+    are downscaled and re-encoded as JPEG, lowering the quality and then the size until the
+    bytes fit the budget. The original is kept if re-encoding would not make it smaller.
+    `info` has the original/sent sizes and dimensions.
+    """
+    image = Image.open(BytesIO(data))
+    info = {"original_bytes": len(data), "original_size": image.size}
+    mime_type = Image.MIME.get(image.format or "", "")
+    if max(image.size) <= max_dimension and len(data) <= max_bytes and mime_type in MODEL_MIME_TYPES:
+        blob = {"mime_type": mime_type, "data": data}
+    else:
+        image = _to_rgb(ImageOps.exif_transpose(image))  # keep phone photos upright once EXIF is dropped
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        while True:
+            for quality in JPEG_QUALITIES:
+                encoded = _encode_jpeg(image, quality)
+                if len(encoded) <= max_bytes:
+                    break
+            if len(encoded) <= max_bytes or max(image.size) <= 256:
+                break
+            image.thumbnail((int(image.width * 0.75), int(image.height * 0.75)), Image.LANCZOS)
+        blob = {"mime_type": "image/jpeg", "data": encoded}
+        if len(encoded) >= len(data) and mime_type in MODEL_MIME_TYPES:
+            blob, image = {"mime_type": mime_type, "data": data}, Image.open(BytesIO(data))
+    info.update(sent_bytes=len(blob["data"]), sent_size=image.size)
+    return blob, info
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image
+
+
+def image_key(data: bytes) -> str:
+    """Content address of an image: the same bytes always map to the same key."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ImageStore:
+    """Content-addressed on-disk store for uploaded images and their thumbnails.
+
+    Each image is written once under its SHA-256 (`originals/<key>`), along with a JPEG
+    thumbnail no larger than `thumb_size` pixels on either side (`thumbs/<key>.jpg`).
+    Session state then only needs the key. A small SQLite index tracks sizes and last use.
+    Once the store holds more than `max_items` images or `max_bytes` bytes, the least
+    recently used images are deleted.
+    """
+
+    def __init__(self, root: str, thumb_size: int = 320, max_items: int = 500, max_bytes: int = 500 * 1024 * 1024):
+        self.root = root
+        self.thumb_size = thumb_size
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        for sub in ("originals", "thumbs"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+        # Streamlit reruns scripts on different threads, so share one connection behind a lock
+        self.conn = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS images (
+                       key TEXT PRIMARY KEY,
+                       size_bytes INTEGER NOT NULL,
+                       last_used REAL NOT NULL
+                   )"""
+            )
+
+    def original_path(self, key: str) -> str:
+        return os.path.join(self.root, "originals", key)
+
+    def thumbnail_path(self, key: str) -> str:
+        return os.path.join(self.root, "thumbs", f"{key}.jpg")
+
+    def _write_atomic(self, path: str, data: bytes):
+        # Write then rename, so a reader never sees a half-written file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _make_thumbnail(self, data: bytes) -> bytes:
+        image = Image.open(BytesIO(data))
+        image.thumbnail((self.thumb_size, self.thumb_size))
+        out = BytesIO()
+        image.convert("RGB").save(out, format="JPEG", quality=85)
+        return out.getvalue()
+
+    def put(self, data: bytes) -> str:
+        """Store an image (if new) and its thumbnail; returns its key."""
+        key = image_key(data)
+        with self.lock:
+            known = self.conn.execute("SELECT 1 FROM images WHERE key = ?", (key,)).fetchone()
+        if not (known and os.path.exists(self.thumbnail_path(key))):
+            thumbnail = self._make_thumbnail(data)
+            self._write_atomic(self.original_path(key), data)
+            self._write_atomic(self.thumbnail_path(key), thumbnail)
+            with self.lock, self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO images (key, size_bytes, last_used) VALUES (?, ?, ?)",
+                                  (key, len(data) + len(thumbnail), time.time()))
+            self._evict()
+        else:
+            self.touch([key])
+        return key
+
+    def thumbnail(self, key: str) -> str | None:
+        """Path of the thumbnail, or None if the image was evicted."""
+        path = self.thumbnail_path(key)
+        return path if os.path.exists(path) else None
+
+    def original(self, key: str) -> bytes | None:
+        try:
+            with open(self.original_path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def touch(self, keys: list[str]):
+        """Mark images as just used (e.g. shown in a history), in one transaction."""
+        if not keys:
+            return
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany("UPDATE images SET last_used = ? WHERE key = ?", [(now, key) for key in keys])
+
+    def _evict(self):
+        with self.lock, self.conn:
+            rows = self.conn.execute("SELECT key, size_bytes FROM images ORDER BY last_used DESC").fetchall()
+            kept, total, evicted = 0, 0, []
+            for key, size in rows:
+                if kept < self.max_items and total + size <= self.max_bytes:
+                    kept += 1
+                    total += size
+                else:
+                    evicted.append(key)
+            self.conn.executemany("DELETE FROM images WHERE key = ?", [(key,) for key in evicted])
+        for key in evicted:
+            for path in (self.original_path(key), self.thumbnail_path(key)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> dict:
+        with self.lock:
+            count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM images").fetchone()
+        return {"images": count, "bytes": total, "max_items": self.max_items, "max_bytes": self.max_bytes}
+
+
+class DescriptionCache:
+    """In-memory LRU of model descriptions keyed by (image hash, prompt), plus upload statistics.
+
+    `hits`/`misses` count lookups. `bytes_saved` adds up the upload bytes avoided, both by
+    downscaling before a call (`record_upload`) and by skipping the call on a hit.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.bytes_sent = self.bytes_saved = 0
+
+    def get(self, key: str, prompt: str, original_bytes: int = 0) -> str | None:
+        with self.lock:
+            description = self.entries.get((key, prompt))
+            if description is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end((key, prompt))
+            self.hits += 1
+            self.bytes_saved += original_bytes
+            return description
+
+    def put(self, key: str, prompt: str, description: str):
+        with self.lock:
+            self.entries[(key, prompt)] = description
+            self.entries.move_to_end((key, prompt))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def record_upload(self, original_bytes: int, sent_bytes: int):
+        with self.lock:
+            self.bytes_sent += sent_bytes
+            self.bytes_saved += max(original_bytes - sent_bytes, 0)  # e.g. a tiny GIF grows as a JPEG
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "bytes_sent": self.bytes_sent, "bytes_saved": self.bytes_saved}
@@ -1,9 +1,16 @@
+import itertools
 import streamlit as st
 from src.embedder import fetch_and_embed
-from src.vector_store import add_topic_to_vector_store, search_index
-from src.gemini_bot import get_fallback_response
+from src.vector_store import add_topic_listener, add_topic_to_vector_store, search_chunks
+from src.context_packer import pack_context
+from src.ingest import ingest_topics
+from src.gemini_bot import answer_cache, cached_response, get_fallback_response, latency_stats, stream_fallback_response
 
 CHUNK_SIZE = 500  # For consistent chunking
+RETRIEVE_K = 3  # Chunks retrieved per question; the packed context is compared with joining these as-is
+# A grounded answer starting with one of these means the context didn't help, so ask Gemini directly
+NOT_FOUND_KEYWORDS = ("does not contain", "no information", "not found")
+NOT_FOUND_CHECK_CHARS = 200  # how much of a streamed grounded answer is held back to check for them
 
 # --- Streamlit Page Setup ---
 st.set_page_config(page_title="Knowledge Updater", layout="wide")
@@ -11,6 +18,9 @@ st.set_page_config(page_title="Knowledge Updater", layout="wide")
 if 'history' not in st.session_state:
     st.session_state.history = []
 
+# Cached answers are dropped when a newly stored topic is relevant to their question
+add_topic_listener(answer_cache.invalidate_matching)
+
 st.title("📘 AI Knowledge Updater")
 
 # --- Topic Fetch Section ---
@@ -28,21 +38,73 @@ with st.expander("📥 Fetch & Store New Topic"):
             else:
                 st.error("❌ Failed to fetch topic. Try a different one.")
 
+with st.expander("📦 Bulk Fetch & Store"):
+    bulk_topics = st.text_area("One topic per line", placeholder="Taj Mahal\nSaturn\nFIFA World Cup")
+    if st.button("Fetch & Store All"):
+        with st.spinner("Fetching, embedding and storing topics in parallel..."):
+            report = ingest_topics(bulk_topics.splitlines(), chunk_size=CHUNK_SIZE)
+        statuses = report['topics']
+        added = [t for t, s in statuses.items() if s == 'added']
+        unchanged = [t for t, s in statuses.items() if s == 'unchanged']
+        failed = [t for t, s in statuses.items() if s == 'failed']
+        if added:
+            st.success(f"✅ Added or updated {len(added)} topics: {', '.join(added)}")
+        if unchanged:
+            st.info(f"ℹ️ Already up to date: {', '.join(unchanged)}")
+        if failed:
+            st.error(f"❌ Failed to fetch: {', '.join(failed)}")
+        st.caption(
+            " · ".join(f"{name}: {stage['items']} {stage['unit']} ({stage['per_s']:.1f}/s)"
+                       for name, stage in report['stages'].items())
+            + f" · total {report['total_s']:.2f}s"
+        )
+
 st.markdown("---")
 
 # --- Chat Section ---
 st.subheader("💬 Ask a Question")
 query = st.text_input("Type your question:")
 
-if st.button("Generate Response"):
-    if query:
-        with st.spinner("Searching knowledge base..."):
-            relevant = search_index(query, k=3)
-
-            # If we found relevant docs, use them first
-            if relevant:
-                context = "\n".join(relevant)
-                prompt = f"""You are a helpful assistant. Answer the question strictly using the context below.
+def ask_gemini(prompt, stream):
+    # Streaming renders chunks as they arrive; write_stream returns the full text
+    if stream:
+        return st.write_stream(stream_fallback_response(prompt))
+    return get_fallback_response(prompt)
+
+def is_not_found(answer):
+    return any(keyword in answer.lower() for keyword in NOT_FOUND_KEYWORDS)
+
+def ask_grounded(prompt, query, stream):
+    """Answer from the context, falling back to Gemini alone if the context doesn't help.
+
+    When streaming, the opening of the grounded answer is held back until it is clear it is not a
+    "not found" reply, so the user never sees that reply streamed before the fallback answer.
+    """
+    if not stream:
+        response = get_fallback_response(prompt)
+        return get_fallback_response(query) if is_not_found(response) else response
+    chunks = stream_fallback_response(prompt)
+    head = ""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= NOT_FOUND_CHECK_CHARS:
+            break
+    if is_not_found(head):
+        chunks.close()
+        return ask_gemini(query, stream)
+    return st.write_stream(itertools.chain([head], chunks))
+
+
+def answer_question(query, stream=True, token_budget=400, context_report=None):
+    relevant = search_chunks(query, k=RETRIEVE_K)
+
+    # If we found relevant docs, use them first
+    if relevant:
+        # Drop near-duplicates, merge neighbouring chunks and keep the context within the token budget
+        context, report = pack_context(relevant, token_budget=token_budget)
+        if context_report is not None:
+            context_report.update(report)
+        prompt = f"""You are a helpful assistant. Answer the question strictly using the context below.
 If the context does not help, say that the information is not found in the context.
 
 Context:
@@ -51,17 +113,40 @@ Context:
 Question: {query}
 Answer:"""
 
-                response = get_fallback_response(prompt)
+        # ✅ Falls back to Gemini alone if the answer says the context doesn't help
+        return ask_grounded(prompt, query, stream)
 
-                # ✅ Fallback if Gemini still returns a weak/unrelated answer
-                if any(keyword in response.lower() for keyword in ["does not contain", "no information", "not found"]):
-                    response = get_fallback_response(query)
+    # No vector data found, fallback directly
+    return ask_gemini(query, stream)
 
-            else:
-                # No vector data found, fallback directly
-                response = get_fallback_response(query)
+
+stream = st.toggle("Stream responses", value=True)
+token_budget = st.slider("Context token budget", min_value=100, max_value=2000, value=400, step=50)
+
+if st.button("Generate Response"):
+    if query:
+        # The answer streams in here, then moves into the chat history below
+        live_answer = st.empty()
+        context_report = {}
+        with live_answer.container():
+            # Repeated or near-duplicate questions are answered from the semantic cache without calling Gemini
+            response = cached_response(query, lambda: answer_question(query, stream, token_budget, context_report))
+        live_answer.empty()
 
         st.session_state.history.append((query, response))
+        stats = answer_cache.stats()
+        latency = latency_stats()
+        st.caption(
+            f"Answer cache: {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate) · "
+            f"Gemini median time to first token {latency['ttft_p50_s']:.2f}s, total {latency['total_p50_s']:.2f}s"
+            + (f" · {latency['errors']} failed calls" if latency['errors'] else "")
+        )
+        if context_report:
+            st.caption(
+                f"Context: {context_report['chunks_in']} chunks → {context_report['passages_packed']} passages "
+                f"({context_report['duplicates_dropped']} duplicates dropped), {context_report['packed_tokens']} "
+                f"tokens instead of {context_report['raw_tokens']} ({context_report['tokens_saved']} saved)"
+            )
 
 # --- Chat History ---
 if st.session_state.history:
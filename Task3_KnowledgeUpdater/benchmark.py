@@ -0,0 +1,252 @@
+"""Offline benchmarks for the knowledge updater.
+
+Run from the Task3 folder, e.g.:
+    python benchmark.py warm-restart --topics "Taj Mahal" "Saturn" "FIFA World Cup"
+    python benchmark.py warm-restart --synthetic 20
+    python benchmark.py pipeline --synthetic 40 --latency 0.3
+    python benchmark.py query-embedding --queries 50
+    python benchmark.py context-packing --budget 400
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+CHUNK_SIZE = 500  # Same chunking as app.py
+
+
+def synthetic_text(topic, n_chars=20000):
+    """Deterministic stand-in article, so the benchmark runs without network access."""
+    rng = random.Random(topic)
+    words = [f"{topic.lower().replace(' ', '_')}{i}" for i in range(50)] + ["the", "of", "and", "in", "was"]
+    text, length = [], 0
+    while length < n_chars:
+        text.append(rng.choice(words))
+        length += len(text[-1]) + 1
+    return " ".join(text)
+
+
+def run_ingest(args):
+    """One 'process lifetime': load the store, fetch + embed + store every topic, print timings as JSON."""
+    start = time.time()
+    from src import embedder, vector_store
+    load_s = time.time() - start
+
+    fetch_s = embed_s = store_s = 0.0
+    for topic in args.topics:
+        t0 = time.time()
+        text = synthetic_text(topic) if args.synthetic_text else embedder.fetch_text(topic)
+        t1 = time.time()
+        if not text:
+            continue
+        chunks = embedder.chunk_text(text, CHUNK_SIZE)
+        embeddings = embedder.embed_chunks(chunks)
+        t2 = time.time()
+        vector_store.add_topic_to_vector_store(topic, chunks, embeddings)
+        fetch_s, embed_s, store_s = fetch_s + t1 - t0, embed_s + t2 - t1, store_s + time.time() - t2
+
+    stats = embedder.embedding_cache.stats()
+    print(json.dumps({'load_s': load_s, 'fetch_s': fetch_s, 'embed_s': embed_s, 'store_s': store_s,
+                      'cache_hits': stats['hits'], 'cache_misses': stats['misses'],
+                      'chunks_stored': vector_store.collection.count()}))
+
+
+def run_pipeline_mode(args):
+    """Ingest synthetic topics through one mode in this (fresh) process and print timings as JSON."""
+    from src import embedder, ingest, vector_store
+    from src.wiki_client import LocalWikiClient
+    client = LocalWikiClient({topic: synthetic_text(topic) for topic in args.topics}, latency=args.latency)
+
+    start = time.time()
+    if args.mode == "sequential":
+        # What the app's single-topic "Fetch & Store" does, once per topic
+        for topic in args.topics:
+            chunks, embeddings = embedder.fetch_and_embed(topic, chunk_size=CHUNK_SIZE, client=client)
+            vector_store.add_topic_to_vector_store(topic, chunks, embeddings)
+        stages = None
+    else:
+        stages = ingest.ingest_topics(args.topics, client=client, chunk_size=CHUNK_SIZE,
+                                      max_fetches=args.max_fetches)['stages']
+    print(json.dumps({'total_s': time.time() - start, 'chunks_stored': vector_store.collection.count(),
+                      'stages': stages}))
+
+
+def bench_pipeline(args):
+    topics = [f"Synthetic topic {i}" for i in range(args.synthetic)]
+    results = {}
+    for mode in ("sequential", "pipeline"):
+        kb_dir = tempfile.mkdtemp(prefix="kb_bench_")
+        try:
+            cmd = [sys.executable, os.path.abspath(__file__), "pipeline-run", "--mode", mode,
+                   "--latency", str(args.latency), "--max-fetches", str(args.max_fetches), "--topics", *topics]
+            out = subprocess.run(cmd, env=dict(os.environ, KNOWLEDGE_BASE_DIR=kb_dir), capture_output=True,
+                                 text=True, check=True).stdout
+            results[mode] = json.loads(out.strip().splitlines()[-1])
+        finally:
+            shutil.rmtree(kb_dir, ignore_errors=True)
+        print(f"{mode:<11} {results[mode]['total_s']:6.2f}s  stored chunks {results[mode]['chunks_stored']}")
+
+    for name, stage in results["pipeline"]["stages"].items():
+        print(f"  {name:<7} {stage['items']:6d} {stage['unit']:<6} {stage['per_s']:8.1f} {stage['unit']}/s")
+    print(f"  speed-up {results['sequential']['total_s'] / results['pipeline']['total_s']:.1f}x "
+          f"({len(topics)} topics, {args.latency:.2f}s simulated fetch latency, {args.max_fetches} fetches in flight)")
+
+
+def bench_query_embedding(args):
+    """search_index latency: Chroma's default query embedding vs the shared project encoder + LRU."""
+    kb_dir = tempfile.mkdtemp(prefix="kb_bench_")
+    os.environ["KNOWLEDGE_BASE_DIR"] = kb_dir
+    try:
+        from src import embedder, ingest, vector_store
+        from src.wiki_client import LocalWikiClient
+        topics = [f"Synthetic topic {i}" for i in range(args.synthetic)]
+        ingest.ingest_topics(topics, client=LocalWikiClient({t: synthetic_text(t) for t in topics}),
+                             chunk_size=CHUNK_SIZE)
+        rng = random.Random(0)
+        queries = [f"what is {rng.choice(topics).lower().replace(' ', '_')}{rng.randrange(50)}"
+                   for _ in range(args.queries)]
+
+        def timed(name, fn):
+            start = time.time()
+            fn(queries[0])  # first call includes any model load
+            first_ms = (time.time() - start) * 1000
+            start = time.time()
+            for q in queries:
+                fn(q)
+            print(f"{name:<34} first call {first_ms:8.1f} ms   then {(time.time() - start) * 1000 / len(queries):7.2f} ms/query")
+
+        try:
+            timed("chroma default (query_texts)",
+                  lambda q: vector_store.collection.query(query_texts=[q], n_results=args.k))
+        except Exception as e:
+            print(f"chroma default (query_texts)       skipped: {e}")
+        timed("project encoder (query_embeddings)",
+              lambda q: vector_store.collection.query(query_embeddings=[embedder.embed_query(q)], n_results=args.k))
+        timed("project encoder, LRU warm", lambda q: vector_store.search_index(q, k=args.k))
+        print(f"  query cache: {embedder.query_cache_stats()}")
+    finally:
+        shutil.rmtree(kb_dir, ignore_errors=True)
+
+
+def bench_context_packing(args):
+    """Prompt tokens per question: joining the raw top-k chunks vs the packed, token-budgeted context."""
+    kb_dir = tempfile.mkdtemp(prefix="kb_bench_")
+    os.environ["KNOWLEDGE_BASE_DIR"] = kb_dir
+    try:
+        from src import ingest, vector_store
+        from src.context_packer import pack_context
+        from src.wiki_client import LocalWikiClient
+        topics = [f"Synthetic topic {i}" for i in range(args.synthetic)]
+        pages = {t: synthetic_text(t) for t in topics}
+        # Mirrors (like redirects or copied sections) produce exact-duplicate chunks under another topic
+        mirrors = {f"{t} (mirror)": pages[t] for t in topics[:args.synthetic // 2]}
+        rng = random.Random(0)
+        queries = [f"what is {rng.choice(topics).lower().replace(' ', '_')}{rng.randrange(50)}"
+                   for _ in range(args.queries)]
+        print(f"{len(queries)} questions, top-{args.k} chunks of {CHUNK_SIZE} chars, budget {args.budget} tokens")
+
+        # Distinct topics first, then the same questions once the mirrors are indexed too
+        for name, new_pages in [("distinct topics only", pages), (f"+ {len(mirrors)} mirrored topics", mirrors)]:
+            ingest.ingest_topics(list(new_pages), client=LocalWikiClient(new_pages), chunk_size=CHUNK_SIZE)
+            reports = []
+            for q in queries:
+                chunks = vector_store.search_chunks(q, k=args.k)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    reports.append(pack_context(chunks, token_budget=args.budget)[1])
+
+            def mean(key):
+                return sum(r[key] for r in reports) / len(reports)
+            print(f"{name}:")
+            print(f"  raw join:  {mean('raw_tokens'):7.1f} tokens/question")
+            print(f"  packed:    {mean('packed_tokens'):7.1f} tokens/question "
+                  f"({mean('passages_packed'):.1f} passages, {mean('duplicates_dropped'):.1f} duplicates dropped)")
+            print(f"  saved:     {mean('tokens_saved'):7.1f} tokens/question "
+                  f"({mean('tokens_saved') / mean('raw_tokens'):.0%})")
+    finally:
+        shutil.rmtree(kb_dir, ignore_errors=True)
+
+
+def bench_warm_restart(args):
+    topics = args.topics or [f"Synthetic topic {i}" for i in range(args.synthetic)]
+    kb_dir = tempfile.mkdtemp(prefix="kb_bench_")
+    env = dict(os.environ, KNOWLEDGE_BASE_DIR=kb_dir)
+    cmd = [sys.executable, os.path.abspath(__file__), "ingest", "--topics", *topics]
+    if not args.topics:
+        cmd.append("--synthetic-text")
+
+    def phase(name):
+        out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"{name:<28} load {result['load_s']:6.2f}s  fetch {result['fetch_s']:6.2f}s  "
+              f"embed {result['embed_s']:6.2f}s  store {result['store_s']:6.2f}s  "
+              f"encoded {result['cache_misses']:5d}  reused {result['cache_hits']:5d}  "
+              f"stored chunks {result['chunks_stored']}")
+        return result
+
+    try:
+        print(f"Ingesting {len(topics)} topics into {kb_dir}")
+        cold = phase("cold start (empty)")
+        warm = phase("warm restart")
+        # Drop the vector store but keep the embedding cache, e.g. after deleting the collection
+        shutil.rmtree(os.path.join(kb_dir, "chroma"))
+        os.remove(os.path.join(kb_dir, "topic_registry.sqlite3"))
+        rebuilt = phase("rebuild store, warm cache")
+        print(f"  embedding time saved: {cold['embed_s'] - warm['embed_s']:.2f}s on warm restart, "
+              f"{cold['embed_s'] - rebuilt['embed_s']:.2f}s on rebuild")
+    finally:
+        shutil.rmtree(kb_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    warm = sub.add_parser("warm-restart", help="cold vs warm-restart ingestion with the persistent store + cache")
+    warm.add_argument("--topics", nargs="+", help="Wikipedia topics (default: synthetic offline articles)")
+    warm.add_argument("--synthetic", type=int, default=20, help="number of synthetic topics when --topics is unset")
+    warm.set_defaults(func=bench_warm_restart)
+
+    pipeline = sub.add_parser("pipeline", help="sequential per-topic ingestion vs the staged bulk pipeline")
+    pipeline.add_argument("--synthetic", type=int, default=40, help="number of synthetic topics")
+    pipeline.add_argument("--latency", type=float, default=0.3, help="simulated fetch latency in seconds")
+    pipeline.add_argument("--max-fetches", type=int, default=8)
+    pipeline.set_defaults(func=bench_pipeline)
+
+    query = sub.add_parser("query-embedding", help="search_index latency: Chroma default embedding vs shared encoder")
+    query.add_argument("--synthetic", type=int, default=20, help="number of synthetic topics to index")
+    query.add_argument("--queries", type=int, default=50)
+    query.add_argument("-k", type=int, default=3)
+    query.set_defaults(func=bench_query_embedding)
+
+    packing = sub.add_parser("context-packing", help="prompt tokens per question: raw top-k join vs packed context")
+    packing.add_argument("--synthetic", type=int, default=20, help="number of synthetic topics to index")
+    packing.add_argument("--queries", type=int, default=50)
+    packing.add_argument("-k", type=int, default=3, help="chunks retrieved per question (the app uses 3)")
+    packing.add_argument("--budget", type=int, default=400, help="context token budget")
+    packing.set_defaults(func=bench_context_packing)
+
+    pipeline_run = sub.add_parser("pipeline-run", help=argparse.SUPPRESS)  # one mode, run in a fresh process
+    pipeline_run.add_argument("--mode", choices=["sequential", "pipeline"], required=True)
+    pipeline_run.add_argument("--topics", nargs="+", required=True)
+    pipeline_run.add_argument("--latency", type=float, default=0.3)
+    pipeline_run.add_argument("--max-fetches", type=int, default=8)
+    pipeline_run.set_defaults(func=run_pipeline_mode)
+
+    ingest = sub.add_parser("ingest", help=argparse.SUPPRESS)  # one phase, run in a fresh process
+    ingest.add_argument("--topics", nargs="+", required=True)
+    ingest.add_argument("--synthetic-text", action="store_true")
+    ingest.set_defaults(func=run_ingest)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
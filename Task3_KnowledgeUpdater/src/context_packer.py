@@ -0,0 +1,113 @@
+"""Pack retrieved chunks into a compact, token-budgeted prompt context.
+
+Between `search_chunks` and the Gemini call:
+1. near-duplicate chunks (same text, or embedding cosine >= `duplicate_threshold`) are dropped,
+2. chunks that are neighbours in the same topic's article are merged back into one passage,
+3. passages are added in relevance order until `token_budget` is reached.
+"""
+import math
+import re
+import numpy as np
+
+# Rough Gemini rule of thumb: about 4 characters per token for English text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _normalized(text):
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def drop_near_duplicates(chunks, threshold=0.95):
+    """Keep the first (most relevant) of any group of chunks with the same text or near-identical embeddings."""
+    kept, kept_vectors, seen_texts = [], [], set()
+    for chunk in chunks:
+        text = _normalized(chunk['text'])
+        if text in seen_texts:
+            continue
+        if chunk.get('embedding') is not None:
+            vector = np.asarray(chunk['embedding'], dtype=np.float32)
+            vector = vector / (np.linalg.norm(vector) + 1e-12)
+            if kept_vectors and (np.stack(kept_vectors) @ vector).max() >= threshold:
+                continue
+            kept_vectors.append(vector)
+        seen_texts.add(text)
+        kept.append(chunk)
+    return kept
+
+
+def merge_adjacent(chunks):
+    """Join chunks that are consecutive slices of the same topic into one passage.
+
+    Passages keep the relevance rank of their best chunk; the text inside a passage is in article order.
+    """
+    by_topic = {}
+    for rank, chunk in enumerate(chunks):
+        by_topic.setdefault(chunk['topic'], []).append((chunk['position'], rank, chunk['text']))
+
+    passages = []
+    for topic, members in by_topic.items():
+        members.sort()
+        run = [members[0]]
+        for member in members[1:]:
+            if member[0] == run[-1][0] + 1:
+                run.append(member)
+            else:
+                passages.append(_passage(topic, run))
+                run = [member]
+        passages.append(_passage(topic, run))
+    return sorted(passages, key=lambda p: p['rank'])
+
+
+def _passage(topic, run):
+    # Chunks are plain slices of the article, so neighbours concatenate back into the original text
+    return {'topic': topic, 'rank': min(rank for _, rank, _ in run), 'chunks': len(run),
+            'text': "".join(text for _, _, text in run)}
+
+
+def _truncate(text, max_tokens):
+    """Cut `text` to about `max_tokens`, at the last sentence (or word) boundary that fits."""
+    cut = text[:max_tokens * CHARS_PER_TOKEN]
+    end = max(cut.rfind(". "), cut.rfind(".\n"))
+    if end > len(cut) // 2:
+        return cut[:end + 1]
+    return cut.rsplit(" ", 1)[0] if " " in cut else cut
+
+
+def pack_context(chunks, token_budget=400, duplicate_threshold=0.95, min_partial_tokens=32):
+    """Build the prompt context from `chunks` (dicts from `search_chunks`, most relevant first).
+
+    Returns `(context, report)`. The report compares the packed context with joining every
+    retrieved chunk as-is: `raw_tokens`, `packed_tokens`, `tokens_saved`, plus chunk counts.
+    """
+    raw_tokens = estimate_tokens("\n".join(c['text'] for c in chunks))
+    unique = drop_near_duplicates(chunks, duplicate_threshold)
+    passages = merge_adjacent(unique)
+
+    parts, used = [], 0
+    for passage in passages:
+        separator = 1 if parts else 0  # the "\n\n" between passages
+        tokens = estimate_tokens(passage['text']) + separator
+        if used + tokens <= token_budget:
+            parts.append(passage['text'])
+            used += tokens
+        elif token_budget - used - separator >= min_partial_tokens:
+            # Fill the rest of the budget with the start of the next most relevant passage
+            partial = _truncate(passage['text'], token_budget - used - separator)
+            if partial:
+                parts.append(partial)
+            break
+        else:
+            break
+
+    context = "\n\n".join(parts)
+    packed_tokens = estimate_tokens(context)
+    report = {'chunks_in': len(chunks), 'duplicates_dropped': len(chunks) - len(unique),
+              'passages': len(passages), 'passages_packed': len(parts), 'raw_tokens': raw_tokens,
+              'packed_tokens': packed_tokens, 'tokens_saved': raw_tokens - packed_tokens}
+    print(f"📦 Context: {report['chunks_in']} chunks -> {report['passages_packed']} passages, "
+          f"{packed_tokens}/{token_budget} tokens ({report['tokens_saved']} saved)")
+    return context, report
@@ -1,30 +1,96 @@
-import wikipedia
-from sentence_transformers import SentenceTransformer
+import os
+import sys
+from functools import lru_cache
+import numpy as np
+from src.embedding_cache import EmbeddingCache, embedding_key
+from src.wiki_client import WikipediaClient
 import time
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+TASK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# The shared embedding service lives in shared/ at the repository root
+sys.path.insert(0, os.path.dirname(TASK_DIR))
+from shared.embedding_service import get_encoder
 
-def fetch_and_embed(topic, chunk_size=1000):
+MODEL_NAME = 'all-MiniLM-L6-v2'
+# Next to the app rather than in the current directory, so every launch finds the same store
+KNOWLEDGE_BASE_DIR = os.getenv("KNOWLEDGE_BASE_DIR", os.path.join(TASK_DIR, "knowledge_base"))
+EMBEDDING_CACHE_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "embedding_cache.sqlite3")
+
+# hash(model, chunk) -> embedding, persisted so restarts and re-fetches skip the encoder
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH)
+
+# Swap for a LocalWikiClient to run without network access
+wiki_client = WikipediaClient()
+
+
+def get_model():
+    """One encoder for stored chunks and queries, loaded on first use and shared by every session.
+
+    Concurrent encodes are micro-batched; set EMBEDDING_SERVICE_SOCKET to use a shared embedding service.
+    """
+    return get_encoder(MODEL_NAME)
+
+
+@lru_cache(maxsize=512)
+def _query_embedding(query):
+    return tuple(get_model().encode([query])[0].tolist())
+
+
+def embed_query(query):
+    """Embed a search query with the same model as the stored chunks; recent queries come from an LRU."""
+    return list(_query_embedding(" ".join(query.split())))
+
+
+def query_cache_stats():
+    info = _query_embedding.cache_info()
+    total = info.hits + info.misses
+    return {'size': info.currsize, 'maxsize': info.maxsize, 'hits': info.hits, 'misses': info.misses,
+            'hit_rate': info.hits / total if total else 0.0}
+
+
+def fetch_text(topic, client=None):
+    return (client or wiki_client).fetch(topic)
+
+
+def chunk_text(text, chunk_size=1000):
+    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+
+def embed_chunks(chunks):
+    """Encode chunks, taking every (model, text) pair that was encoded before from the cache."""
+    keys = [embedding_key(MODEL_NAME, chunk) for chunk in chunks]
+    cached = embedding_cache.get_many(keys)
+
+    # Encode each missing text once, even if it repeats within the batch
+    missing = {}
+    for key, chunk in zip(keys, chunks):
+        if key not in cached:
+            missing.setdefault(key, chunk)
+    if missing:
+        encoded = get_model().encode(list(missing.values()))
+        fresh = dict(zip(missing, np.asarray(encoded, dtype=np.float32)))
+        embedding_cache.put_many(fresh.items())
+        cached.update(fresh)
+    print(f"🧠 {len(chunks) - len(missing)} chunk embeddings reused from cache, {len(missing)} encoded")
+
+    return [cached[key].tolist() for key in keys]
+
+
+def fetch_and_embed(topic, chunk_size=1000, client=None):
     print(f"\n📚 Fetching data for: {topic}")
-    
-    try:
-        text = wikipedia.page(topic).content
-    except:
-        try:
-            text = wikipedia.search(topic)[0]
-            text = wikipedia.page(text).content
-        except Exception as e:
-            print(f"❌ Wikipedia fetch failed: {e}")
-            return [], []
+
+    text = fetch_text(topic, client)
+    if not text:
+        return [], []
 
     # Split text into chunks
-    chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+    chunks = chunk_text(text, chunk_size)
     print(f"🧠 Chunked into {len(chunks)} parts of ~{chunk_size} chars")
 
     # Compute embeddings
     start = time.time()
-    embeddings = model.encode(chunks).tolist()
+    embeddings = embed_chunks(chunks)
     print(f"✅ Embedding complete in {time.time() - start:.2f}s")
 
     return chunks, embeddings
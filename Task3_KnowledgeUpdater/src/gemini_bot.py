@@ -1,20 +1,183 @@
-import google.generativeai as genai
 import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+import numpy as np
 from dotenv import load_dotenv
+from src.embedder import embed_query
 
 load_dotenv()
 
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=GOOGLE_API_KEY)
-model = genai.GenerativeModel("models/gemini-1.5-flash")
+if os.getenv("FAKE_GEMINI"):
+    # Offline mode: replay canned chunked responses instead of calling the API (shared/ at the repository root)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from shared.fake_gemini import FakeGenerativeModel
+    model = FakeGenerativeModel()
+else:
+    import google.generativeai as genai
+    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+    genai.configure(api_key=GOOGLE_API_KEY)
+    model = genai.GenerativeModel("models/gemini-1.5-flash")
+
+ERROR_RESPONSE = "Sorry, I couldn't find anything related."
+
+# Latency of the most recent Gemini calls: {'ttft_s', 'total_s', 'streamed', 'error'}
+call_metrics = deque(maxlen=200)
+# Whether the last call on this thread failed (each Streamlit session runs on its own thread)
+_last_call = threading.local()
+
+
+def last_call_failed():
+    return getattr(_last_call, 'failed', False)
+
 
 def get_fallback_response(question):
+    start = time.time()
+    _last_call.failed = False
     try:
         response = model.generate_content(question)
-        return response.text
+        text = response.text
     except Exception as e:
         print(f"Gemini Error: {e}")
-        return "Sorry, I couldn't find anything related."
+        _last_call.failed = True
+        call_metrics.append({'ttft_s': None, 'total_s': time.time() - start, 'streamed': False, 'error': str(e)})
+        return ERROR_RESPONSE
+    elapsed = time.time() - start
+    call_metrics.append({'ttft_s': elapsed, 'total_s': elapsed, 'streamed': False, 'error': None})
+    return text
+
+
+def stream_fallback_response(question):
+    """Like get_fallback_response, but yields text chunks as Gemini produces them.
+
+    Time to first token and total latency are recorded in `call_metrics`. If the stream fails,
+    the error is recorded too and `last_call_failed()` is true, even when some text was already
+    yielded, so that partial answer is not cached.
+    """
+    start = time.time()
+    _last_call.failed = False
+    metrics = {'ttft_s': None, 'total_s': None, 'streamed': True, 'error': None}
+    try:
+        for chunk in model.generate_content(question, stream=True):
+            text = getattr(chunk, "text", "")
+            if not text:
+                continue
+            if metrics['ttft_s'] is None:
+                metrics['ttft_s'] = time.time() - start
+            yield text
+    except Exception as e:
+        print(f"Gemini Error: {e}")
+        _last_call.failed = True
+        metrics.update(total_s=time.time() - start, error=str(e))
+        call_metrics.append(metrics)
+        if metrics['ttft_s'] is None:
+            yield ERROR_RESPONSE
+        return
+    metrics['total_s'] = time.time() - start
+    call_metrics.append(metrics)
+
+
+def latency_stats():
+    """Median time to first token and total latency over the recent successful calls."""
+    calls = [m for m in call_metrics if m['ttft_s'] is not None and not m['error']]
+    errors = sum(1 for m in call_metrics if m['error'])
+    if not calls:
+        return {'calls': 0, 'errors': errors, 'ttft_p50_s': 0.0, 'total_p50_s': 0.0}
+    return {'calls': len(calls), 'errors': errors,
+            'ttft_p50_s': float(np.median([m['ttft_s'] for m in calls])),
+            'total_p50_s': float(np.median([m['total_s'] for m in calls]))}
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / (np.linalg.norm(vector) + 1e-12)
+
+
+class SemanticAnswerCache:
+    """Answers keyed by question embedding, so repeated and near-duplicate questions skip Gemini.
+
+    A question hits when its cosine similarity to a cached question is at least `threshold`.
+    Entries expire after `ttl` seconds and the least recently used one is evicted beyond
+    `maxsize`. `invalidate_matching` drops answers that newly ingested chunks are relevant to.
+    """
+
+    def __init__(self, threshold=0.92, maxsize=256, ttl=3600, invalidate_threshold=0.5):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.invalidate_threshold = invalidate_threshold
+        self.entries = OrderedDict()  # id -> (unit question embedding, question, answer, created)
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _drop_expired(self):
+        now = time.time()
+        for entry_id in [i for i, e in self.entries.items() if now - e[3] > self.ttl]:
+            del self.entries[entry_id]
+
+    def get(self, embedding):
+        query = _unit(embedding)
+        with self.lock:
+            self._drop_expired()
+            if self.entries:
+                ids = list(self.entries)
+                similarity = np.stack([self.entries[i][0] for i in ids]) @ query
+                best = int(np.argmax(similarity))
+                if similarity[best] >= self.threshold:
+                    self.entries.move_to_end(ids[best])
+                    self.hits += 1
+                    return self.entries[ids[best]][2]
+            self.misses += 1
+            return None
+
+    def put(self, embedding, question, answer):
+        with self.lock:
+            self.entries[self.next_id] = (_unit(embedding), question, answer, time.time())
+            self.next_id += 1
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate_matching(self, chunk_embeddings):
+        """Drop cached answers whose question is similar to any of the new chunks; returns how many."""
+        if not len(chunk_embeddings):
+            return 0
+        chunks = np.asarray(chunk_embeddings, dtype=np.float32)
+        chunks = chunks / (np.linalg.norm(chunks, axis=1, keepdims=True) + 1e-12)
+        with self.lock:
+            stale = [i for i, e in self.entries.items() if (chunks @ e[0]).max() >= self.invalidate_threshold]
+            for entry_id in stale:
+                del self.entries[entry_id]
+        if stale:
+            print(f"🔁 Dropped {len(stale)} cached answers that the new topic may change")
+        return len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {'size': len(self.entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0}
+
+
+answer_cache = SemanticAnswerCache()
+
+
+def cached_response(question, generate):
+    """Return the cached answer for a (near-)duplicate question, else call `generate()` and cache it."""
+    embedding = embed_query(question)
+    answer = answer_cache.get(embedding)
+    if answer is not None:
+        return answer
+    answer = generate()
+    # Never cache failures, including a stream that broke off after part of the answer
+    if answer != ERROR_RESPONSE and not last_call_failed():
+        answer_cache.put(embedding, question, answer)
+    return answer
 
 # Testing the function
 if __name__ == "__main__":
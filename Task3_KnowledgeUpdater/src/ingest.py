@@ -0,0 +1,114 @@
+"""Bulk topic ingestion as a staged pipeline: fetch -> chunk -> encode -> store.
+
+- fetch: up to `max_fetches` Wikipedia requests in flight at once (I/O bound, thread pool)
+- encode: chunks from many topics are packed into batches of about `encode_batch_size`
+- store: a writer thread stores finished topics with batched `collection.add` calls
+
+The stages overlap: topics keep downloading while earlier ones are encoded and written.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src import embedder, vector_store
+from src.topic_registry import content_hash
+
+
+def _stage(unit):
+    return {'items': 0, 'unit': unit, 'busy_s': 0.0}
+
+
+def ingest_topics(topics, client=None, chunk_size=500, max_fetches=4, encode_batch_size=256, write_batch_topics=16):
+    """Fetch, embed and store many topics. Returns per-topic status and per-stage throughput.
+
+    `client` is anything with a `fetch(topic) -> text` method, e.g. `LocalWikiClient` for offline use.
+    Topic status is 'added' (new or changed content), 'unchanged' or 'failed'.
+    """
+    start = time.time()
+    topics = list(dict.fromkeys(t.strip() for t in topics if t and t.strip()))
+    status = {}
+    stages = {'fetch': _stage('topics'), 'encode': _stage('chunks'), 'store': _stage('chunks')}
+    write_queue = queue.Queue(maxsize=4)
+    errors = []
+
+    def writer():
+        while True:
+            batch = write_queue.get()
+            if batch is None:
+                return
+            try:
+                t0 = time.time()
+                stored = vector_store.add_topics_to_vector_store(batch)
+                stages['store']['busy_s'] += time.time() - t0
+                stages['store']['items'] += sum(len(chunks) for _, chunks, _ in batch)
+                for (topic, _, _), added in zip(batch, stored):
+                    status[topic] = 'added' if added else 'unchanged'
+            except Exception as e:
+                errors.append(e)
+
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    writer_thread.start()
+
+    def fetch(topic):
+        t0 = time.time()
+        return topic, embedder.fetch_text(topic, client), time.time() - t0
+
+    pending = []  # (topic, chunks) waiting for the encoder
+    ready = []  # (topic, chunks, embeddings) waiting for the writer
+
+    def flush_encoder():
+        if not pending:
+            return
+        t0 = time.time()
+        # One encoder call for the chunks of several topics
+        embeddings = embedder.embed_chunks([chunk for _, chunks in pending for chunk in chunks])
+        offset = 0
+        for topic, chunks in pending:
+            ready.append((topic, chunks, embeddings[offset:offset + len(chunks)]))
+            offset += len(chunks)
+        stages['encode']['busy_s'] += time.time() - t0
+        stages['encode']['items'] += offset
+        pending.clear()
+        if len(ready) >= write_batch_topics:
+            write_queue.put(list(ready))
+            ready.clear()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_fetches) as pool:
+            futures = [pool.submit(fetch, topic) for topic in topics]
+            for future in as_completed(futures):
+                topic, text, seconds = future.result()
+                stages['fetch']['busy_s'] += seconds
+                stages['fetch']['items'] += 1
+                if not text:
+                    status[topic] = 'failed'
+                    continue
+
+                chunks = embedder.chunk_text(text, chunk_size)
+                entry = vector_store.registry.get(topic)
+                if entry and entry['content_hash'] == content_hash(chunks):
+                    status[topic] = 'unchanged'  # Nothing to encode or write
+                    continue
+                pending.append((topic, chunks))
+                if sum(len(c) for _, c in pending) >= encode_batch_size:
+                    flush_encoder()
+            fetch_wall_s = time.time() - start
+
+        flush_encoder()
+        if ready:
+            write_queue.put(list(ready))
+    finally:
+        write_queue.put(None)
+        writer_thread.join()
+    if errors:
+        raise errors[0]
+
+    total_s = time.time() - start
+    stages['fetch']['wall_s'] = fetch_wall_s
+    for name, stage in stages.items():
+        # Fetches overlap, so their throughput is measured on wall-clock time
+        seconds = stage.get('wall_s', stage['busy_s'])
+        stage['per_s'] = stage['items'] / seconds if seconds else 0.0
+        print(f"📊 {name:<6} {stage['items']:6d} {stage['unit']:<6} {stage['per_s']:8.1f} {stage['unit']}/s")
+    print(f"✅ Ingested {sum(s == 'added' for s in status.values())}/{len(topics)} topics in {total_s:.2f}s")
+    return {'topics': status, 'stages': stages, 'total_s': total_s}
@@ -0,0 +1,81 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+def content_hash(chunks):
+    """Fingerprint of a topic's text, used to tell an unchanged re-fetch from an updated article."""
+    return hashlib.sha256("".join(chunks).encode("utf-8")).hexdigest()
+
+
+class TopicRegistry:
+    """SQLite table of stored topics: topic -> chunk count, content hash and fetch time.
+
+    Lets the vector store answer "is this topic already stored?" with one primary-key lookup
+    instead of reading the metadata of every chunk in the collection.
+    """
+
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Streamlit reruns scripts on different threads, so share one connection behind a lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS topics (
+                       topic TEXT PRIMARY KEY,
+                       chunk_count INTEGER NOT NULL,
+                       content_hash TEXT NOT NULL,
+                       fetched_at REAL NOT NULL
+                   )"""
+            )
+
+    def get(self, topic):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT chunk_count, content_hash, fetched_at FROM topics WHERE topic = ?", (topic,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"topic": topic, "chunk_count": row[0], "content_hash": row[1], "fetched_at": row[2]}
+
+    def __contains__(self, topic):
+        return self.get(topic) is not None
+
+    def upsert(self, topic, chunk_count, content_hash, fetched_at=None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO topics (topic, chunk_count, content_hash, fetched_at) VALUES (?, ?, ?, ?)",
+                (topic, chunk_count, content_hash, fetched_at or time.time()),
+            )
+
+    def upsert_many(self, entries):
+        """Insert or replace (topic, chunk_count, content_hash, fetched_at) rows in one transaction."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO topics (topic, chunk_count, content_hash, fetched_at) VALUES (?, ?, ?, ?)",
+                entries,
+            )
+
+    def delete(self, topic):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM topics WHERE topic = ?", (topic,))
+
+    def topics(self):
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT topic FROM topics ORDER BY topic")]
+
+    def total_chunks(self):
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(SUM(chunk_count), 0) FROM topics").fetchone()[0]
+
+    def replace_all(self, entries):
+        """Overwrite the whole table with (topic, chunk_count, content_hash, fetched_at) rows."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM topics")
+            self.conn.executemany(
+                "INSERT INTO topics (topic, chunk_count, content_hash, fetched_at) VALUES (?, ?, ?, ?)", entries
+            )
@@ -1,39 +1,134 @@
+import os
+import threading
+import time
 import chromadb
 from chromadb.config import Settings
+from src.embedder import KNOWLEDGE_BASE_DIR, embed_query
+from src.topic_registry import TopicRegistry, content_hash
 
-chroma_client = chromadb.Client(Settings(anonymized_telemetry=False))
+CHROMA_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "chroma")
+REGISTRY_PATH = os.path.join(KNOWLEDGE_BASE_DIR, "topic_registry.sqlite3")
+
+# On-disk collection: stored topics survive restarts instead of being fetched and embedded again
+chroma_client = chromadb.PersistentClient(path=CHROMA_PATH, settings=Settings(anonymized_telemetry=False))
 collection = chroma_client.get_or_create_collection(name="knowledge_base")
 
+# topic -> chunk count / content hash / fetch time, so existence checks don't scan the collection
+registry = TopicRegistry(REGISTRY_PATH)
+_write_lock = threading.Lock()
 
-def add_topic_to_vector_store(topic, chunks, embeddings):
+# Called with the chunk embeddings of every newly stored or updated topic (e.g. to invalidate caches)
+_topic_listeners = []
+
+
+def add_topic_listener(listener):
+    if listener not in _topic_listeners:
+        _topic_listeners.append(listener)
+
+
+def sync_registry():
+    """Rebuild the registry from chunk metadata when it disagrees with the collection (e.g. after a crash)."""
+    if registry.total_chunks() == collection.count():
+        return
+    topics = {}
     existing = collection.get(include=['metadatas']) if collection.count() else {"metadatas": []}
-    existing_topics = {m['topic'] for m in existing['metadatas']}
+    for m in existing['metadatas']:
+        entry = topics.setdefault(m['topic'], [0, m.get('content_hash', ''), m.get('fetched_at', 0.0)])
+        entry[0] += 1
+    registry.replace_all([(topic, count, hash_, fetched_at) for topic, (count, hash_, fetched_at) in topics.items()])
+    print(f"🔁 Topic registry rebuilt from vector store ({len(topics)} topics)")
+
+
+sync_registry()
+
+
+def add_topic_to_vector_store(topic, chunks, embeddings):
+    return add_topics_to_vector_store([(topic, chunks, embeddings)])[0]
+
+
+def add_topics_to_vector_store(items, max_batch_size=5000):
+    """Store many (topic, chunks, embeddings) at once; returns, per item, whether it was added/updated.
+
+    Changed topics are deleted in one call and all new chunks are written in a few large
+    `collection.add` batches instead of one round-trip per topic.
+    """
+    stored = [False] * len(items)
+    with _write_lock:
+        new_entries, added = {}, {}
+        for i, (topic, chunks, embeddings) in enumerate(items):
+            new_hash = content_hash(chunks)
+            entry = registry.get(topic)
+            if (entry and entry['content_hash'] == new_hash) or topic in added:
+                print(f"⚠️ Topic '{topic}' already exists in vector store.")
+                continue
+            added[topic] = (i, entry)
+            new_entries[topic] = (chunks, embeddings, new_hash)
+
+        # Articles that changed since they were stored: replace only those topics' chunks
+        changed = [topic for topic, (_, entry) in added.items() if entry]
+        if changed:
+            collection.delete(where={"topic": {"$in": changed}})
+
+        fetched_at = time.time()
+        documents, vectors, metadatas, ids = [], [], [], []
+        for topic, (chunks, embeddings, new_hash) in new_entries.items():
+            documents.extend(chunks)
+            vectors.extend(embeddings)
+            metadatas.extend({"topic": topic, "content_hash": new_hash, "fetched_at": fetched_at} for _ in chunks)
+            ids.extend(f"{topic}_{i}" for i in range(len(chunks)))
+
+        max_batch_size = min(max_batch_size, chroma_client.get_max_batch_size())
+        for start in range(0, len(ids), max_batch_size):
+            end = start + max_batch_size
+            collection.add(
+                documents=documents[start:end],
+                embeddings=vectors[start:end],
+                metadatas=metadatas[start:end],
+                ids=ids[start:end]
+            )
+        # Registry is written after the collection, so a crash in between is repaired by sync_registry()
+        registry.upsert_many([(topic, len(chunks), new_hash, fetched_at)
+                              for topic, (chunks, _, new_hash) in new_entries.items()])
+
+    if new_entries:
+        new_vectors = [vector for _, embeddings, _ in new_entries.values() for vector in embeddings]
+        for listener in _topic_listeners:
+            listener(new_vectors)
 
-    if topic in existing_topics:
-        print(f"⚠️ Topic '{topic}' already exists in vector store.")
-        return False
+    for topic, (i, entry) in added.items():
+        stored[i] = True
+        if entry:
+            print(f"🔁 Topic '{topic}' updated in vector DB ({entry['chunk_count']} -> {len(items[i][1])} chunks)")
+        else:
+            print(f"✅ Topic '{topic}' added to vector DB")
+    return stored
 
-    ids = [f"{topic}_{i}" for i in range(len(chunks))]
-    metadatas = [{"topic": topic} for _ in range(len(chunks))]
 
-    collection.add(
-        documents=chunks,
-        embeddings=embeddings,
-        metadatas=metadatas,
-        ids=ids
-    )
-    print(f"✅ Topic '{topic}' added to vector DB")
-    return True
+def search_chunks(query, k=3):
+    """Top-k chunks for `query` with their topic, position in the article, distance and embedding."""
+    # Embed with the project's encoder (same space as the stored chunks), not Chroma's default model
+    results = collection.query(query_embeddings=[embed_query(query)], n_results=k,
+                               include=['documents', 'metadatas', 'distances', 'embeddings'])
+    chunks = []
+    for i, chunk_id in enumerate(results['ids'][0]):
+        chunks.append({
+            'text': results['documents'][0][i],
+            'topic': results['metadatas'][0][i]['topic'],
+            'position': int(chunk_id.rsplit('_', 1)[1]),  # ids are f"{topic}_{i}"
+            'distance': results['distances'][0][i],
+            'embedding': results['embeddings'][0][i],
+        })
+    return chunks
 
 
 def search_index(query, k=3):
-    results = collection.query(query_texts=[query], n_results=k)
+    chunks = search_chunks(query, k)
 
-    if results['documents'][0]:
+    if chunks:
         print("\n📌 Top Matching Chunks:")
-        for i, doc in enumerate(results['documents'][0]):
-            print(f" 🔹 Chunk {i+1}: {doc[:150]}...\n")
-        return results['documents'][0]  # ✅ Return as list of chunks
+        for i, chunk in enumerate(chunks):
+            print(f" 🔹 Chunk {i+1}: {chunk['text'][:150]}...\n")
+        return [chunk['text'] for chunk in chunks]  # ✅ Return as list of chunks
     else:
         print("\n⚠️ No matching chunks found in vector DB.")
         return []
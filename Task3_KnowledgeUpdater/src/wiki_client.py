@@ -0,0 +1,45 @@
+import os
+import time
+import wikipedia
+
+
+class WikipediaClient:
+    """Fetches article text from Wikipedia, falling back to the first search hit."""
+
+    def fetch(self, topic):
+        try:
+            return wikipedia.page(topic).content
+        except:
+            try:
+                text = wikipedia.search(topic)[0]
+                return wikipedia.page(text).content
+            except Exception as e:
+                print(f"❌ Wikipedia fetch failed: {e}")
+                return None
+
+
+class LocalWikiClient:
+    """Offline stand-in for WikipediaClient.
+
+    Serves articles from a dict ({topic: text}) or a folder of `<topic>.txt` files. `latency`
+    (seconds) simulates the network round-trip, so the ingestion pipeline can be tested and
+    benchmarked without network access.
+    """
+
+    def __init__(self, pages=None, directory=None, latency=0.0):
+        self.pages = dict(pages or {})
+        self.directory = directory
+        self.latency = latency
+
+    def fetch(self, topic):
+        if self.latency:
+            time.sleep(self.latency)
+        if topic in self.pages:
+            return self.pages[topic]
+        if self.directory:
+            path = os.path.join(self.directory, f"{topic}.txt")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    return f.read()
+        print(f"❌ No local page for: {topic}")
+        return None
@@ -1,11 +1,19 @@
 import streamlit as st
-from src.sentiment_logic import analyze_sentiment
+from src.sentiment_logic import ONLINE_MODEL_PATH, analyze_sentiment, load
+from src.retrain import bootstrap_retrainer
 
 # -----------------------------
 # Page Configuration
 # -----------------------------
 st.set_page_config(page_title="Sentiment Chatbot", page_icon="🤖", layout="centered")
 
+# Load the model once per server process, before the first message instead of on it
+@st.cache_resource
+def preload_sentiment_model():
+    load()
+
+preload_sentiment_model()
+
 st.title("🤖 Sentiment-Aware Chatbot")
 st.write("Type a message and I'll detect its sentiment!")
 
@@ -95,3 +103,35 @@ with col2:
 for sender, msg, senti in st.session_state.messages:
     styled_message(sender, msg, senti)
 
+
+# -----------------------------
+# Corrections & Online Retraining
+# -----------------------------
+@st.cache_resource
+def get_retrainer():
+    # Shared by all sessions; the online model starts from the last accepted version saved to
+    # online_model.pkl, or else from the training split of the dataset
+    return bootstrap_retrainer(save_path=ONLINE_MODEL_PATH)
+
+if "corrections" not in st.session_state:
+    st.session_state.corrections = []
+
+user_messages = [msg for sender, msg, _ in st.session_state.messages if sender == "You"]
+with st.expander("🧠 Correct the bot"):
+    if user_messages:
+        message = st.selectbox("Message", list(reversed(user_messages)))
+        label = st.radio("Correct sentiment", ["positive", "neutral", "negative"], horizontal=True)
+        if st.button("Add correction"):
+            st.session_state.corrections.append((message, label))
+    st.caption(f"{len(st.session_state.corrections)} correction(s) waiting")
+    if st.button("Retrain now", disabled=not st.session_state.corrections):
+        texts, labels = zip(*st.session_state.corrections)
+        # Validated on the holdout set, then hot-swapped into the running app if it is good enough
+        report = get_retrainer().update(list(texts), list(labels), epochs=5)
+        st.session_state.corrections = []
+        if report["swapped"]:
+            st.success(f"✅ Model version {report['version']} is live and saved to online_model.pkl "
+                       f"(holdout accuracy {report['holdout_accuracy']:.1%}, trained in {report['train_s']:.2f}s)")
+        else:
+            st.warning(f"⚠️ Kept the current model: holdout accuracy {report['holdout_accuracy']:.1%} "
+                       f"vs {report['live_accuracy']:.1%}")
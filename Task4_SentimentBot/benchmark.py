@@ -0,0 +1,213 @@
+"""Offline benchmarks for the sentiment bot.
+
+Run from the Task4 folder, e.g.:
+    python benchmark.py batch --messages 20000 --batch-size 1000
+    python benchmark.py import-time --runs 5
+    python benchmark.py scorer --messages 5000
+    python benchmark.py bulk --rows 500000 --workers 0 1 2 4
+    python benchmark.py retrain --batch 500
+"""
+import argparse
+import json
+import os
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import pandas as pd
+
+DATASET_PATH = "data/sentiment_dataset.csv"
+
+
+def load_messages(n):
+    texts = pd.read_csv(DATASET_PATH)['text'].astype(str).tolist()
+    return (texts * (n // len(texts) + 1))[:n]
+
+
+def bench_batch(args):
+    """Messages/sec of a per-message analyze_sentiment loop vs analyze_sentiment_batch."""
+    from src import sentiment_logic
+    messages = load_messages(args.messages)
+
+    start = time.perf_counter()
+    single = [sentiment_logic.analyze_sentiment(m) for m in messages]
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = []
+    for i in range(0, len(messages), args.batch_size):
+        batched.extend(sentiment_logic.analyze_sentiment_batch(messages[i:i + args.batch_size]))
+    batch_s = time.perf_counter() - start
+
+    same = sum(a == b for a, b in zip(single, batched))
+    print(f"{len(messages)} messages, batch size {args.batch_size}")
+    print(f"  analyze_sentiment loop:  {len(messages) / single_s:10.0f} messages/s")
+    print(f"  analyze_sentiment_batch: {len(messages) / batch_s:10.0f} messages/s")
+    print(f"  speed-up {single_s / batch_s:.1f}x, identical results for {same}/{len(messages)} messages")
+
+
+def bench_scorer(args):
+    """Per-message latency and load time: sklearn transform/predict_proba vs the compiled scorer."""
+    import numpy as np
+    from src import sentiment_logic
+    from src.compiled_scorer import CompiledScorer, load_sklearn_model
+
+    cleaned = [sentiment_logic.clean_text(m) for m in load_messages(args.messages)]
+    model, vectorizer, le = load_sklearn_model(sentiment_logic.MODEL_PATH)
+    scorer = CompiledScorer.from_sklearn(model, vectorizer, le)
+
+    start = time.perf_counter()
+    expected = []
+    for text in cleaned:
+        vector = vectorizer.transform([text])
+        le.inverse_transform(model.predict(vector))
+        expected.append(model.predict_proba(vector)[0])
+    sklearn_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = [scorer.predict_proba([text])[0] for text in cleaned]
+    compiled_s = time.perf_counter() - start
+
+    diff = np.abs(np.array(expected) - np.array(compiled)).max()
+    same = sum(e.argmax() == c.argmax() for e, c in zip(expected, compiled))
+    print(f"{len(cleaned)} messages, one at a time")
+    print(f"  sklearn transform + predict/predict_proba: {sklearn_s / len(cleaned) * 1e6:8.1f} us/message")
+    print(f"  compiled scorer:                           {compiled_s / len(cleaned) * 1e6:8.1f} us/message")
+    print(f"  speed-up {sklearn_s / compiled_s:.1f}x, max |probability difference| {diff:.1e}, "
+          f"same label for {same}/{len(cleaned)}")
+
+    if os.path.exists(sentiment_logic.SCORER_PATH):
+        # Fresh processes, so the pickle pays for importing sklearn as it would in a new worker
+        loads = {'sentiment_model.pkl (pickle)': "from src.compiled_scorer import load_sklearn_model; "
+                                                 "load_sklearn_model('sentiment_model.pkl')",
+                 'sentiment_scorer.npz': "from src.compiled_scorer import CompiledScorer; "
+                                         "CompiledScorer.load('sentiment_scorer.npz')"}
+        for name, code in loads.items():
+            timer = f"import time; start = time.perf_counter(); {code}; print(time.perf_counter() - start)"
+            seconds = [float(subprocess.run([sys.executable, "-c", timer], capture_output=True, text=True,
+                                            check=True).stdout.strip().splitlines()[-1]) for _ in range(args.repeats)]
+            print(f"  cold load of {name:<28} {statistics.median(seconds) * 1000:7.1f} ms")
+
+
+def bench_bulk(args):
+    """Rows/sec of the bulk CSV scorer for different worker counts (0 = in-process)."""
+    from src.bulk_score import score_csv
+    tmp_dir = tempfile.mkdtemp(prefix="bulk_bench_")
+    try:
+        input_path = os.path.join(tmp_dir, "messages.csv")
+        pd.DataFrame({'text': load_messages(args.rows)}).to_csv(input_path, index=False)
+        results = {}
+        for workers in args.workers:
+            start = time.perf_counter()
+            score_csv(input_path, os.path.join(tmp_dir, f"scored_{workers}.csv"), chunksize=args.chunksize,
+                      workers=workers)
+            results[workers] = args.rows / (time.perf_counter() - start)
+        print(f"{args.rows} rows, chunks of {args.chunksize}")
+        for workers, rows_per_s in results.items():
+            print(f"  workers={workers:<3} {rows_per_s:10.0f} rows/s")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def bench_retrain(args):
+    """Time to absorb a new labelled batch: full TF-IDF + LogisticRegression refit vs partial_fit + hot-swap."""
+    from sklearn.base import clone
+    from src import retrain, sentiment_logic
+    from src.compiled_scorer import CompiledScorer, load_sklearn_model
+
+    train, holdout = retrain.split_dataset()
+    new_batch = train.sample(n=min(args.batch, len(train)), random_state=0)
+    clean = sentiment_logic.clean_text
+    holdout_texts = [clean(t) for t in holdout['text']]
+    holdout_labels = holdout['sentiment'].tolist()
+
+    # Full refit, as sentiment_model.ipynb does it (clean every row, refit the vectorizer and the model)
+    model, vectorizer, le = load_sklearn_model(sentiment_logic.MODEL_PATH)
+    start = time.perf_counter()
+    texts = [clean(t) for t in train['text']]
+    new_vectorizer = clone(vectorizer)
+    new_model = clone(model).fit(new_vectorizer.fit_transform(texts), le.transform(train['sentiment']))
+    refit_s = time.perf_counter() - start
+    refit_accuracy = retrain.accuracy(CompiledScorer.from_sklearn(new_model, new_vectorizer, le),
+                                      holdout_texts, holdout_labels)
+
+    retrainer = retrain.bootstrap_retrainer()
+    report = retrainer.update(new_batch['text'].tolist(), new_batch['sentiment'].tolist())
+    print(f"{len(train)} training rows, new batch of {len(new_batch)} rows, {len(holdout)} holdout rows")
+    print(f"  full refit (TF-IDF + LogisticRegression): {refit_s * 1000:8.1f} ms, holdout accuracy {refit_accuracy:.3f}")
+    print(f"  incremental partial_fit:                  {report['train_s'] * 1000:8.1f} ms, holdout accuracy "
+          f"{report['holdout_accuracy']:.3f} ({'swapped in' if report['swapped'] else 'rejected'})")
+    print(f"  speed-up {refit_s / report['train_s']:.1f}x")
+
+
+def run_startup(args):
+    """Time the import and the first prediction in this (fresh) process; print them as JSON.
+
+    With --eager, the import also loads everything up front (NLTK resources and the model),
+    as the module did before loading became lazy.
+    """
+    start = time.perf_counter()
+    from src import sentiment_logic
+    if args.eager:
+        sentiment_logic.load()
+    import_s = time.perf_counter() - start
+    start = time.perf_counter()
+    sentiment_logic.analyze_sentiment("Awesome product!")
+    first_call_s = time.perf_counter() - start
+    print(json.dumps({'import_s': import_s, 'first_call_s': first_call_s}))
+
+
+def bench_import_time(args):
+    """Cold-start cost of eager loading at import (the old behaviour) vs lazy loading on the first prediction."""
+    print(f"median of {args.runs} fresh processes")
+    print(f"{'':>6} | {'import':>9} | {'first call':>10} | {'import + first call':>19}")
+    for mode in ('eager', 'lazy'):
+        cmd = [sys.executable, os.path.abspath(__file__), "startup"] + (["--eager"] if mode == 'eager' else [])
+        runs = [json.loads(subprocess.run(cmd, capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1])
+                for _ in range(args.runs)]
+        import_s = statistics.median(r['import_s'] for r in runs)
+        first_call_s = statistics.median(r['first_call_s'] for r in runs)
+        print(f"{mode:>6} | {import_s * 1000:6.1f} ms | {first_call_s * 1000:7.1f} ms | "
+              f"{(import_s + first_call_s) * 1000:16.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    batch = sub.add_parser("batch", help="per-message loop vs analyze_sentiment_batch throughput")
+    batch.add_argument("--messages", type=int, default=20000)
+    batch.add_argument("--batch-size", type=int, default=1000)
+    batch.set_defaults(func=bench_batch)
+
+    scorer = sub.add_parser("scorer", help="per-message latency: sklearn pipeline vs compiled array scorer")
+    scorer.add_argument("--messages", type=int, default=5000)
+    scorer.add_argument("--repeats", type=int, default=5, help="fresh-process loads timed per file format")
+    scorer.set_defaults(func=bench_scorer)
+
+    bulk = sub.add_parser("bulk", help="bulk CSV scoring rows/sec by number of worker processes")
+    bulk.add_argument("--rows", type=int, default=500000)
+    bulk.add_argument("--chunksize", type=int, default=50000)
+    bulk.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    bulk.set_defaults(func=bench_bulk)
+
+    retrain = sub.add_parser("retrain", help="full refit vs incremental partial_fit on a new labelled batch")
+    retrain.add_argument("--batch", type=int, default=500, help="rows in the new labelled batch")
+    retrain.set_defaults(func=bench_retrain)
+
+    startup = sub.add_parser("import-time", help="cold start with eager vs lazy loading, in fresh processes")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.set_defaults(func=bench_import_time)
+
+    run = sub.add_parser("startup", help=argparse.SUPPRESS)  # one measurement, run in a fresh process
+    run.add_argument("--eager", action="store_true")
+    run.set_defaults(func=run_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Score a large CSV of messages with the sentiment model, chunk by chunk.
+
+    python -m src.bulk_score data/sentiment_dataset.csv scored.csv
+    python -m src.bulk_score chat_logs.csv scored.parquet --workers 8 --chunksize 100000
+
+The input is read `chunksize` rows at a time. Chunks are scored in worker processes, each
+of which loads the model once. At most `max_pending` chunks are in flight, so memory stays
+bounded whatever the input size. Results are written in input order as each chunk
+completes, with `label` and `score` columns appended, to CSV or (with pyarrow) Parquet.
+"""
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from src import sentiment_logic
+
+LABEL_COLUMN = "label"
+SCORE_COLUMN = "score"
+
+
+def _init_worker():
+    sentiment_logic.load()
+
+
+def score_texts(texts):
+    """Labels and scores for one chunk of messages (runs in a worker process)."""
+    results = sentiment_logic.analyze_sentiment_batch(texts)
+    return [r["label"] for r in results], [float(r["score"]) for r in results]
+
+
+class _CsvWriter:
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, chunk):
+        chunk.to_csv(self.path, mode="w" if self.header else "a", header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        pass
+
+
+class _ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet output needs pyarrow: pip install pyarrow")
+        self.pa, self.pq = pyarrow, pyarrow.parquet
+        self.path = path
+        self.writer = None
+
+    def write(self, chunk):
+        if self.writer is None:
+            table = self.pa.Table.from_pandas(chunk, preserve_index=False)
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        else:
+            # Later chunks are cast to the first chunk's schema, e.g. an all-empty column stays a string
+            table = self.pa.Table.from_pandas(chunk, schema=self.writer.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_writer(path):
+    return _ParquetWriter(path) if path.endswith((".parquet", ".pq")) else _CsvWriter(path)
+
+
+def score_csv(input_path, output_path, text_column="text", chunksize=50_000, workers=None, max_pending=None):
+    """Score every row of `input_path` and write it with label/score columns to `output_path`.
+
+    `workers=0` scores in this process. Returns the number of rows written.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    max_pending = max_pending or max(2 * workers, 1)
+    writer = open_writer(output_path)
+    start = time.time()
+    rows = 0
+
+    def write(chunk, scored):
+        nonlocal rows
+        chunk[LABEL_COLUMN], chunk[SCORE_COLUMN] = scored
+        writer.write(chunk)
+        rows += len(chunk)
+        elapsed = time.time() - start
+        print(f"📊 {rows:,} rows scored in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers else None
+    try:
+        pending = deque()  # (chunk, future) in input order
+        # Read the text as str in every chunk, so e.g. an all-numeric chunk doesn't change the column type
+        for chunk in pd.read_csv(input_path, chunksize=chunksize, dtype={text_column: str}):
+            if text_column not in chunk.columns:
+                raise ValueError(f"Column '{text_column}' not found in {input_path}")
+            texts = chunk[text_column].fillna("").astype(str).tolist()
+            if pool is None:
+                write(chunk, score_texts(texts))
+                continue
+            pending.append((chunk, pool.submit(score_texts, texts)))
+            # Write the oldest chunk before reading more, so output order is fixed and memory bounded
+            while len(pending) >= max_pending:
+                chunk, future = pending.popleft()
+                write(chunk, future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            write(chunk, future.result())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        writer.close()
+
+    print(f"✅ Wrote {rows:,} rows to {output_path} in {time.time() - start:.1f}s")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV file with a text column")
+    parser.add_argument("output", help="output .csv or .parquet file")
+    parser.add_argument("--text-column", default="text")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="rows per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count, 0: none)")
+    parser.add_argument("--max-pending", type=int, default=None, help="chunks in flight (default: 2 x workers)")
+    args = parser.parse_args()
+    score_csv(args.input, args.output, args.text_column, args.chunksize, args.workers, args.max_pending)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Array-backed TF-IDF + logistic regression scorer exported from `sentiment_model.pkl`.
+
+The pickled sklearn objects are reduced to plain arrays: a token -> feature index table,
+the IDF weights, the coefficients/intercepts and the label names. Scoring a message is then
+tokenize -> sparse TF-IDF row -> dot product -> softmax, with the same probabilities as
+`model.predict_proba(vectorizer.transform(...))` and none of sklearn's per-call overhead.
+
+Export (writes a pickle-free .npz next to the .pkl):
+    python -m src.compiled_scorer
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# Softmax over classes (multinomial), one-vs-rest sigmoids normalised to 1, or a binary sigmoid
+PROBA_MODES = ('softmax', 'ovr', 'binary')
+
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_sklearn_model(path):
+    """The pickled `(model, vectorizer, le)` tuple saved by sentiment_model.ipynb."""
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _probabilities(decision, mode):
+    if mode == 'binary':
+        positive = _sigmoid(decision[:, 0])
+        return np.column_stack([1 - positive, positive])
+    if mode == 'ovr':
+        proba = _sigmoid(decision)
+        return proba / proba.sum(axis=1, keepdims=True)
+    decision = decision - decision.max(axis=1, keepdims=True)
+    proba = np.exp(decision)
+    return proba / proba.sum(axis=1, keepdims=True)
+
+
+class CompiledScorer:
+    """TF-IDF (word n-grams, optional sublinear tf, l2 norm) followed by a linear model."""
+
+    def __init__(self, tokens, idf, coef, intercept, labels, ngram_range=(1, 1), stop_words=(),
+                 token_pattern=r"(?u)\b\w\w+\b", lowercase=True, sublinear_tf=False, norm='l2',
+                 proba_mode='softmax', source_sha256=''):
+        self.tokens = [str(t) for t in tokens]
+        self.vocabulary = {token: i for i, token in enumerate(self.tokens)}
+        self.idf = np.asarray(idf, dtype=np.float64)
+        # Features x classes, so the rows of one message's features can be gathered directly
+        self.coef_t = np.ascontiguousarray(np.asarray(coef, dtype=np.float64).T)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.labels = [str(label) for label in labels]
+        self.ngram_range = tuple(int(n) for n in ngram_range)
+        self.stop_words = frozenset(str(w) for w in stop_words)
+        self.token_pattern = str(token_pattern)
+        self.token_re = re.compile(self.token_pattern)
+        self.lowercase = bool(lowercase)
+        self.sublinear_tf = bool(sublinear_tf)
+        self.norm = norm or None
+        self.proba_mode = str(proba_mode)
+        self.source_sha256 = str(source_sha256)
+
+    @classmethod
+    def from_sklearn(cls, model, vectorizer, le, source_sha256=''):
+        params = vectorizer.get_params()
+        unsupported = {k: params[k] for k in ('analyzer', 'preprocessor', 'tokenizer', 'strip_accents', 'binary')
+                       if params[k] not in ('word', None, False)}
+        if unsupported or not params['use_idf'] or params['norm'] not in ('l2', None):
+            raise ValueError(f"Cannot compile vectorizer settings: {unsupported or params}")
+        tokens = [None] * len(vectorizer.vocabulary_)
+        for token, index in vectorizer.vocabulary_.items():
+            tokens[index] = token
+
+        scorer = cls(tokens, vectorizer.idf_, model.coef_, model.intercept_, le.inverse_transform(model.classes_),
+                     ngram_range=params['ngram_range'], stop_words=vectorizer.get_stop_words() or (),
+                     token_pattern=params['token_pattern'], lowercase=params['lowercase'],
+                     sublinear_tf=params['sublinear_tf'], norm=params['norm'], source_sha256=source_sha256)
+
+        # sklearn turns decision values into probabilities differently across versions and settings,
+        # so pick the formula that reproduces this model's predict_proba
+        rng = np.random.default_rng(0)
+        probe = csr_matrix(rng.random((8, len(tokens))) * (rng.random((8, len(tokens))) < 0.2))
+        expected = model.predict_proba(probe)
+        decision = probe @ scorer.coef_t + scorer.intercept
+        for mode in PROBA_MODES:
+            if (mode == 'binary') == (scorer.coef_t.shape[1] == 1) and \
+                    np.allclose(_probabilities(decision, mode), expected, rtol=0, atol=1e-12):
+                scorer.proba_mode = mode
+                return scorer
+        raise ValueError("Cannot reproduce the model's predict_proba with a linear scorer")
+
+    # -------------------- Pickle-free file format --------------------
+    # Arrays are stored as .npy members, everything else as one JSON string
+    def save(self, path):
+        meta = {'tokens': self.tokens, 'labels': self.labels, 'ngram_range': list(self.ngram_range),
+                'stop_words': sorted(self.stop_words), 'token_pattern': self.token_pattern,
+                'lowercase': self.lowercase, 'sublinear_tf': self.sublinear_tf, 'norm': self.norm,
+                'proba_mode': self.proba_mode, 'source_sha256': self.source_sha256}
+        np.savez(path, meta=np.array(json.dumps(meta)), idf=self.idf, coef=self.coef_t.T, intercept=self.intercept)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            return cls(meta.pop('tokens'), data['idf'], data['coef'], data['intercept'], meta.pop('labels'), **meta)
+
+    # -------------------- Scoring --------------------
+    def _features(self, text):
+        """Feature indices and TF-IDF weights of one text, like one row of `vectorizer.transform`."""
+        if self.lowercase:
+            text = text.lower()
+        words = [w for w in self.token_re.findall(text) if w not in self.stop_words]
+        min_n, max_n = self.ngram_range
+        counts = {}
+        for n in range(min_n, min(max_n, len(words)) + 1):
+            for i in range(len(words) - n + 1):
+                index = self.vocabulary.get(words[i] if n == 1 else " ".join(words[i:i + n]))
+                if index is not None:
+                    counts[index] = counts.get(index, 0) + 1
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.sublinear_tf:
+            values = np.log(values) + 1
+        values *= self.idf[indices]
+        if self.norm == 'l2' and len(values):
+            values /= np.sqrt(np.dot(values, values))
+        return indices, values
+
+    def predict_proba(self, texts):
+        """Class probabilities for already cleaned texts, shape (len(texts), len(labels))."""
+        if len(texts) == 1:
+            indices, values = self._features(texts[0])
+            decision = (values @ self.coef_t[indices] + self.intercept)[None, :]
+        else:
+            rows = [self._features(text) for text in texts]
+            indptr = np.cumsum([0] + [len(indices) for indices, _ in rows])
+            matrix = csr_matrix((np.concatenate([v for _, v in rows]) if rows else [],
+                                 np.concatenate([i for i, _ in rows]) if rows else [], indptr),
+                                shape=(len(texts), len(self.tokens)))
+            decision = np.asarray(matrix @ self.coef_t) + self.intercept
+        return _probabilities(decision, self.proba_mode)
+
+
+def export(model_path, scorer_path):
+    model, vectorizer, le = load_sklearn_model(model_path)
+    scorer = CompiledScorer.from_sklearn(model, vectorizer, le, source_sha256=file_sha256(model_path))
+    scorer.save(scorer_path)
+    print(f"✅ Exported {len(scorer.tokens)} features x {len(scorer.labels)} classes "
+          f"({scorer.proba_mode}) to {scorer_path}")
+    return scorer
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join(root, "sentiment_model.pkl"))
+    parser.add_argument("--out", default=os.path.join(root, "sentiment_scorer.npz"))
+    args = parser.parse_args()
+    export(args.model, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Incremental retraining of the sentiment model on newly labelled batches.
+
+`OnlineSentimentModel` is a HashingVectorizer (no vocabulary to refit) feeding an SGD
+logistic regression, so each new batch is a `partial_fit` instead of a full TF-IDF +
+LogisticRegression refit. `Retrainer.update` trains a copy of the current version,
+checks it against a holdout set and only then swaps it into `sentiment_logic`:
+
+    retrainer = Retrainer(holdout_texts, holdout_labels)
+    retrainer.update(new_texts, new_labels)   # validated, then hot-swapped if good enough
+"""
+import copy
+import os
+import pickle
+import threading
+import time
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import train_test_split
+from src import sentiment_logic
+
+LABELS = ('negative', 'neutral', 'positive')
+DATASET_PATH = os.path.join(sentiment_logic.ROOT_DIR, "data", "sentiment_dataset.csv")
+
+
+class OnlineSentimentModel:
+    """Same `predict_proba(cleaned_texts)` / `labels` interface as `CompiledScorer`, but trainable batch by batch."""
+
+    def __init__(self, labels=LABELS, n_features=2 ** 18, alpha=1e-5, random_state=0):
+        self.labels = list(labels)
+        self.vectorizer = HashingVectorizer(n_features=n_features, ngram_range=(1, 2), stop_words='english',
+                                            alternate_sign=False, norm='l2')
+        self.classifier = SGDClassifier(loss='log_loss', alpha=alpha, random_state=random_state)
+        self.version = 0
+        self.rows_seen = 0
+
+    def partial_fit(self, cleaned_texts, labels, epochs=1):
+        y = np.array([self.labels.index(label.lower()) for label in labels])
+        X = self.vectorizer.transform(cleaned_texts)
+        for _ in range(epochs):
+            self.classifier.partial_fit(X, y, classes=np.arange(len(self.labels)))
+        self.version += 1
+        self.rows_seen += len(y)
+        return self
+
+    def predict_proba(self, cleaned_texts):
+        return self.classifier.predict_proba(self.vectorizer.transform(cleaned_texts))
+
+    def save(self, path):
+        # Write then rename, so a restarting app never reads a half-written model
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def accuracy(model, cleaned_texts, labels):
+    """Share of `labels` that `model` (anything with predict_proba and labels) predicts correctly."""
+    predicted = model.predict_proba(cleaned_texts).argmax(axis=1)
+    return float(np.mean([model.labels[p].lower() == label.lower() for p, label in zip(predicted, labels)]))
+
+
+class Retrainer:
+    """Applies labelled batches to an online model and hot-swaps versions that pass the holdout check.
+
+    A candidate is accepted when its holdout accuracy is at least the live model's minus `tolerance`
+    (and at least `min_accuracy`). The live model is never modified in place: each update trains a
+    copy, so predictions running meanwhile keep using the previous version until the swap.
+
+    A rejected batch is discarded, and the next update trains from the last accepted model again.
+    With `carry_rejected=True`, later updates build on the rejected candidate instead. Its weights
+    keep absorbing every batch, but only validated versions are ever served.
+
+    With `save_path`, every accepted version is also saved there, e.g. to
+    `sentiment_logic.ONLINE_MODEL_PATH`, which `sentiment_logic.load()` prefers on the next start.
+    """
+
+    def __init__(self, holdout_texts, holdout_labels, model=None, tolerance=0.01, min_accuracy=0.0,
+                 carry_rejected=False, save_path=None):
+        self.holdout_texts = [sentiment_logic.clean_text(t) for t in holdout_texts]
+        self.holdout_labels = list(holdout_labels)
+        self.model = model or OnlineSentimentModel()
+        self.tolerance = tolerance
+        self.min_accuracy = min_accuracy
+        self.carry_rejected = carry_rejected
+        self.save_path = save_path
+        self.history = []
+        self.lock = threading.Lock()  # one update at a time
+
+    def update(self, texts, labels, epochs=1):
+        """Train on one labelled batch; returns a report and swaps the model in if it validates."""
+        with self.lock:
+            start = time.time()
+            candidate = copy.deepcopy(self.model)
+            candidate.partial_fit([sentiment_logic.clean_text(t) for t in texts], labels, epochs)
+            train_s = time.time() - start
+
+            live = sentiment_logic.get_scorer()
+            live_accuracy = accuracy(live, self.holdout_texts, self.holdout_labels)
+            candidate_accuracy = accuracy(candidate, self.holdout_texts, self.holdout_labels)
+            swapped = candidate_accuracy >= max(live_accuracy - self.tolerance, self.min_accuracy)
+            if swapped or self.carry_rejected:
+                self.model = candidate
+            if swapped:
+                sentiment_logic.swap_scorer(candidate)
+                if self.save_path:
+                    candidate.save(self.save_path)
+
+            report = {'version': candidate.version, 'rows': len(texts), 'rows_seen': candidate.rows_seen,
+                      'train_s': train_s, 'holdout_accuracy': candidate_accuracy,
+                      'live_accuracy': live_accuracy, 'swapped': swapped}
+            self.history.append(report)
+            status = "✅ swapped in" if swapped else "⚠️ kept previous model"
+            print(f"🔁 Version {candidate.version}: trained on {len(texts)} rows in {train_s:.2f}s, holdout "
+                  f"accuracy {candidate_accuracy:.3f} vs live {live_accuracy:.3f} -> {status}")
+            return report
+
+
+def split_dataset(path=DATASET_PATH, holdout_fraction=0.2, random_state=42):
+    """(train_df, holdout_df), split like the train/test split in sentiment_model.ipynb."""
+    df = pd.read_csv(path)
+    return train_test_split(df, test_size=holdout_fraction, random_state=random_state)
+
+
+def bootstrap_retrainer(path=DATASET_PATH, epochs=5, save_path=None, **kwargs):
+    """A Retrainer whose online model has already seen the training split, validated on the holdout split.
+
+    The bootstrapped model is not swapped in; the next accepted `update` is. If `save_path` holds a
+    previously accepted version, training resumes from it instead of starting over.
+    """
+    train, holdout = split_dataset(path)
+    if save_path and os.path.exists(save_path):
+        model = OnlineSentimentModel.load(save_path)
+    else:
+        model = OnlineSentimentModel()
+        model.partial_fit([sentiment_logic.clean_text(t) for t in train['text']], train['sentiment'].tolist(), epochs)
+    return Retrainer(holdout['text'].tolist(), holdout['sentiment'].tolist(), model=model, save_path=save_path,
+                     **kwargs)
@@ -1,36 +1,148 @@
-import pickle
+"""Sentiment prediction for the chatbot.
+
+Nothing heavy happens at import. NLTK resources, the stop word set and the model are loaded
+on first use (thread-safe), or up front with `load()`. The model is the array-backed
+`CompiledScorer`, read from `sentiment_scorer.npz` when it was exported from the current
+`sentiment_model.pkl`, else compiled from the pickle at load time. A version accepted by
+`src.retrain` and saved to `online_model.pkl` takes precedence over both.
+"""
+import os
 import re
-from sklearn.feature_extraction import text
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import stopwords
-import nltk
+import threading
+
+# Next to src/, so the app works from any working directory
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(ROOT_DIR, "sentiment_model.pkl")
+SCORER_PATH = os.path.join(ROOT_DIR, "sentiment_scorer.npz")
+ONLINE_MODEL_PATH = os.path.join(ROOT_DIR, "online_model.pkl")
+
+# NLTK package -> resource path looked up locally before any download is attempted
+NLTK_RESOURCES = {'wordnet': 'corpora/wordnet', 'omw-1.4': 'corpora/omw-1.4', 'stopwords': 'corpora/stopwords'}
+
+# Set by load(); the scorer is replaced as a whole, so a prediction always sees one consistent model
+scorer = None
+stop_words = None
+lemmatizer = None
+
+_load_lock = threading.Lock()
+_preprocessing_ready = False
+
+
+def ensure_nltk_resource(package, resource):
+    """Download an NLTK package only if it isn't installed locally; returns whether it is available."""
+    import nltk
+    try:
+        nltk.data.find(resource)
+        return True
+    except LookupError:
+        pass
+    try:
+        return nltk.download(package, quiet=True)
+    except Exception as e:
+        print(f"⚠️ Could not download NLTK '{package}': {e}")
+        return False
+
+
+def _load_preprocessing():
+    global stop_words, lemmatizer, _preprocessing_ready
+    with _load_lock:
+        if _preprocessing_ready:
+            return
+        from nltk.stem import WordNetLemmatizer
+        from sklearn.feature_extraction import text
+
+        available = {package: ensure_nltk_resource(package, resource) for package, resource in NLTK_RESOURCES.items()}
+        words = set(text.ENGLISH_STOP_WORDS)
+        if available['stopwords']:
+            from nltk.corpus import stopwords
+            words |= set(stopwords.words('english'))
+        else:
+            print("⚠️ NLTK stopwords unavailable (offline?), using scikit-learn's English stop words only")
+        # Without wordnet, lemmatize() raises and clean_text keeps the word as it is
+        lemmatizer = WordNetLemmatizer()
+        stop_words = words
+        _preprocessing_ready = True
+
+
+def _load_scorer(model_path):
+    from src.compiled_scorer import CompiledScorer, file_sha256, load_sklearn_model
+
+    if model_path == MODEL_PATH and os.path.exists(ONLINE_MODEL_PATH):
+        if not os.path.exists(MODEL_PATH) or os.path.getmtime(ONLINE_MODEL_PATH) >= os.path.getmtime(MODEL_PATH):
+            from src.retrain import OnlineSentimentModel
+            return OnlineSentimentModel.load(ONLINE_MODEL_PATH)
+        print("⚠️ online_model.pkl is older than sentiment_model.pkl, ignoring the retrained version")
+    if model_path == MODEL_PATH and os.path.exists(SCORER_PATH):
+        compiled = CompiledScorer.load(SCORER_PATH)
+        if not os.path.exists(MODEL_PATH) or compiled.source_sha256 == file_sha256(MODEL_PATH):
+            return compiled
+        print("⚠️ sentiment_scorer.npz was exported from an older sentiment_model.pkl, "
+              "re-export it with `python -m src.compiled_scorer`")
+    return CompiledScorer.from_sklearn(*load_sklearn_model(model_path), source_sha256=file_sha256(model_path))
 
-nltk.download('wordnet')
-nltk.download('omw-1.4')
-nltk.download('stopwords')
 
-with open('sentiment_model.pkl', 'rb') as f:
-    model, vectorizer, le = pickle.load(f)
+def load(model_path=None):
+    """Load preprocessing resources and the model now instead of on the first prediction."""
+    global scorer
+    _load_preprocessing()
+    with _load_lock:
+        if scorer is not None and model_path is None:
+            return
+        scorer = _load_scorer(model_path or MODEL_PATH)
+
+
+def get_scorer():
+    """The model predictions currently use, loaded on first call."""
+    if scorer is None:
+        load()
+    return scorer
+
+
+def swap_scorer(new_scorer):
+    """Replace the model used by predictions (e.g. after retraining) without restarting; returns the old one.
+
+    `new_scorer` needs `predict_proba(cleaned_texts)` and `labels`. Each prediction reads the scorer
+    once, so it runs entirely on either the old or the new model.
+    """
+    global scorer
+    _load_preprocessing()
+    with _load_lock:
+        previous, scorer = scorer, new_scorer
+    return previous
+
+URL_PATTERN = re.compile(r"http\S+")
+NON_ALPHA_PATTERN = re.compile(r"[^a-zA-Z\s]")
+
+# word -> lemma, or None for stop words; chat vocabulary is small, so most words are looked up once
+_lemma_table = {}
+MAX_LEMMA_TABLE_SIZE = 200_000
+
+
+def _lemma(word):
+    if word in _lemma_table:
+        return _lemma_table[word]
+    if word in stop_words:
+        lemma = None
+    else:
+        try:
+            lemma = lemmatizer.lemmatize(word)
+        except:
+            lemma = word
+    if len(_lemma_table) >= MAX_LEMMA_TABLE_SIZE:
+        _lemma_table.clear()
+    _lemma_table[word] = lemma
+    return lemma
 
-stop_words = set(stopwords.words('english')).union(text.ENGLISH_STOP_WORDS)
-lemmatizer = WordNetLemmatizer()
 
 # Text preprocessing
 def clean_text(text_input):
     """Clean and preprocess user input."""
-    text_input = re.sub(r"http\S+", "", text_input)  # remove URLs
-    text_input = re.sub(r"[^a-zA-Z\s]", "", text_input)  # remove punctuation/numbers
-    text_input = text_input.lower()
-    words = text_input.split()
-    
-    cleaned_words = []
-    for word in words:
-        if word not in stop_words:
-            try:
-                cleaned_words.append(lemmatizer.lemmatize(word))
-            except:
-                cleaned_words.append(word)
-    return " ".join(cleaned_words)
+    if not _preprocessing_ready:
+        _load_preprocessing()
+    text_input = URL_PATTERN.sub("", text_input)  # remove URLs
+    text_input = NON_ALPHA_PATTERN.sub("", text_input)  # remove punctuation/numbers
+    lemmas = (_lemma(word) for word in text_input.lower().split())
+    return " ".join(lemma for lemma in lemmas if lemma is not None)
 
 # Sentiment analysis
 def analyze_sentiment(text_input):
@@ -38,12 +150,28 @@ def analyze_sentiment(text_input):
     if not text_input.strip():
         return {"label": "NEUTRAL", "score": 0.0}
 
+    current = get_scorer()
     cleaned = clean_text(text_input)
-    vector = vectorizer.transform([cleaned])
-    prediction = model.predict(vector)[0]
-    probabilities = model.predict_proba(vector)[0]
+    probabilities = current.predict_proba([cleaned])[0]
+    best = probabilities.argmax()
 
-    sentiment_label = le.inverse_transform([prediction])[0]
-    confidence = round(max(probabilities) * 100, 2)
+    sentiment_label = current.labels[best]
+    confidence = round(probabilities[best] * 100, 2)
 
     return {"label": sentiment_label.upper(), "score": confidence}
+
+
+def analyze_sentiment_batch(texts):
+    """Like `analyze_sentiment` for many messages, scored as one sparse matrix product."""
+    results = [{"label": "NEUTRAL", "score": 0.0} for _ in texts]
+    indices = [i for i, t in enumerate(texts) if t.strip()]
+    if not indices:
+        return results
+
+    current = get_scorer()
+    probabilities = current.predict_proba([clean_text(texts[i]) for i in indices])
+    best = probabilities.argmax(axis=1)
+    for row, i in enumerate(indices):
+        results[i] = {"label": current.labels[best[row]].upper(),
+                      "score": round(probabilities[row, best[row]] * 100, 2)}
+    return results
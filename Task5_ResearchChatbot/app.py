@@ -1,3 +1,4 @@
+import os
 import streamlit as st
 from src.search_engine import PaperSearchEngine
 
@@ -26,13 +27,32 @@ with st.sidebar:
         """
     )
 
-@st.cache_data(show_spinner=True)
-def load_search_engine():
-    embeddings_path = "models/paper_embeddings.npy"
-    csv_path = "data/arxiv_subset.csv"
-    return PaperSearchEngine(embeddings_path, csv_path, alpha=0.6)  # You can tune alpha here
+BUNDLE_DIR = "models/search_bundle"
+EMBEDDINGS_PATH = "models/paper_embeddings.npy"
+CSV_PATH = "data/arxiv_subset.csv"
 
-search_engine = load_search_engine()
+# cache_resource shares one engine (and its memory-mapped bundle) instead of pickling a copy per session.
+# `corpus_version` is part of the cache key, so the engine is reloaded when the data files change;
+# max_entries=1 releases the previous engine (embeddings, indexes, caches, mmaps) when that happens.
+@st.cache_resource(show_spinner=True, max_entries=1)
+def load_search_engine(corpus_version):
+    if os.path.isdir(BUNDLE_DIR):
+        return PaperSearchEngine.from_bundle(BUNDLE_DIR, alpha=0.6)  # Built with `python -m src.bundle`
+    return PaperSearchEngine(EMBEDDINGS_PATH, CSV_PATH, alpha=0.6)  # You can tune alpha here
+
+def current_corpus_version():
+    paths = [os.path.join(BUNDLE_DIR, "manifest.json")] if os.path.isdir(BUNDLE_DIR) else [CSV_PATH, EMBEDDINGS_PATH]
+    return tuple((os.path.getsize(p), os.path.getmtime(p)) for p in paths)
+
+search_engine = load_search_engine(current_corpus_version())
+
+with st.sidebar:
+    st.markdown("---")
+    stats = search_engine.cache_stats()
+    st.caption(
+        f"Query cache — embeddings: {stats['embeddings']['hits']} hits / {stats['embeddings']['misses']} misses, "
+        f"results: {stats['results']['hits']} hits / {stats['results']['misses']} misses"
+    )
 
 st.title("🔍 Research Paper Search Chatbot")
 st.markdown(
@@ -44,15 +64,51 @@ st.markdown(
 
 with st.form("search_form"):
     query = st.text_input("Enter keywords or question", max_chars=150, placeholder="E.g., machine learning applications in healthcare")
+    # Only offer filters for columns the loaded CSV / bundle has; filtering on a missing one raises ValueError
+    filter_columns = search_engine.filter_columns()
+    author, category, year_start, year_end = "", "", 0, 0
+    if filter_columns:
+        with st.expander("Filters"):
+            if 'authors' in filter_columns:
+                author = st.text_input("Author", placeholder="E.g., Yann LeCun")
+            if 'category' in filter_columns:
+                category = st.text_input("Category", placeholder="E.g., cs.LG")
+            if 'year' in filter_columns:
+                year_from, year_to = st.columns(2)
+                year_start = year_from.number_input("From year (0 = any)", min_value=0, max_value=2100, value=0)
+                year_end = year_to.number_input("To year (0 = any)", min_value=0, max_value=2100, value=0)
     submitted = st.form_submit_button("Search")
 
-if submitted and query.strip():
+filters = {}
+if author.strip():
+    filters['authors'] = author.strip()
+if category.strip():
+    filters['category'] = category.strip()
+if year_start or year_end:
+    filters['year'] = (year_start or None, year_end or None)
+
+PAGE_SIZE = 5
+
+# Keep the last submitted search across reruns so the page buttons can move through its results
+if submitted:
+    st.session_state.search = (query.strip(), filters)
+    st.session_state.page = 0
+
+if st.session_state.get("search") and st.session_state.search[0]:
+    active_query, active_filters = st.session_state.search
+    page = st.session_state.get("page", 0)
     with st.spinner("Searching for relevant papers..."):
-        results = search_engine.search(query.strip(), top_k=5)
+        # Later pages reuse the engine's cached ranking, so paging does not re-score the corpus
+        try:
+            results = search_engine.search(active_query, top_k=PAGE_SIZE, filters=active_filters,
+                                           offset=page * PAGE_SIZE)
+        except ValueError as e:  # e.g. a saved search whose filter column the reloaded corpus lacks
+            st.warning(f"Could not apply the filters: {e}")
+            results = []
 
     if results:
-        st.success(f"Found {len(results)} relevant papers:")
-        for i, paper in enumerate(results, start=1):
+        st.success(f"Showing results {page * PAGE_SIZE + 1}-{page * PAGE_SIZE + len(results)}:")
+        for i, paper in enumerate(results, start=page * PAGE_SIZE + 1):
             st.markdown(f"### {i}. {paper['title']}")
             authors = paper.get('authors', 'N/A')
             st.markdown(f"**Authors:** {authors}")
@@ -61,5 +117,13 @@ if submitted and query.strip():
             st.markdown("---")
     else:
         st.warning("No relevant papers found. Try refining your query.")
+
+    previous_col, next_col = st.columns(2)
+    if previous_col.button("⬅️ Previous", disabled=page == 0):
+        st.session_state.page = page - 1
+        st.rerun()
+    if next_col.button("Next ➡️", disabled=len(results) < PAGE_SIZE):
+        st.session_state.page = page + 1
+        st.rerun()
 else:
     st.info("Please enter a query to start searching.")
@@ -0,0 +1,232 @@
+"""Offline benchmarks for the research paper search engine.
+
+Run from the Task5 folder, e.g.:
+    python benchmark.py ann --nprobe 1 4 16
+    python benchmark.py search-many --queries 500
+    python benchmark.py quantization --rerank-depth 300
+    python benchmark.py embedding-service --clients 1 8 32
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+
+from src.ann_index import IVFIndex, recall_at_k
+from src.quantization import QUANTIZATION_MODES, QuantizedEmbeddings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # for shared/
+
+EMBEDDINGS_PATH = "models/paper_embeddings.npy"
+CSV_PATH = "data/arxiv_subset.csv"
+BUNDLE_DIR = "models/search_bundle"
+
+
+def load_engine(args, **kwargs):
+    # Imported lazily so the ANN benchmark runs without sentence-transformers installed
+    from src.search_engine import PaperSearchEngine
+    if os.path.isdir(args.bundle):
+        return PaperSearchEngine.from_bundle(args.bundle, **kwargs)
+    return PaperSearchEngine(args.embeddings, args.csv, **kwargs)
+
+
+def sample_queries(engine, n, seed=0):
+    """Use paper titles as realistic queries."""
+    titles = engine.segments[0].columns['title']
+    rng = np.random.default_rng(seed)
+    return [str(titles[i]) for i in rng.choice(len(titles), size=min(n, len(titles)), replace=False)]
+
+
+def load_normalized_embeddings(path):
+    embeddings = np.load(path).astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def perturbed_queries(embeddings, n, seed=0):
+    """Perturbed corpus vectors stand in for real queries (no model needed)."""
+    rng = np.random.default_rng(seed)
+    queries = embeddings[rng.choice(len(embeddings), size=min(n, len(embeddings)), replace=False)]
+    queries = queries + rng.normal(scale=0.05, size=queries.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def bench_ann(args):
+    """Recall@k and per-query latency of the IVF index vs exact brute force."""
+    embeddings = load_normalized_embeddings(args.embeddings)
+    queries = perturbed_queries(embeddings, args.queries)
+
+    start = time.time()
+    index = IVFIndex.build(embeddings, n_lists=args.n_lists)
+    print(f"Built IVF index: {index.n_lists} lists over {index.n_docs} papers in {time.time() - start:.2f}s")
+
+    # Same work as the engine's exact path: partition out the top k, then sort only those
+    start = time.time()
+    for q in queries:
+        scores = embeddings @ q
+        top = np.argpartition(-scores, args.k - 1)[:args.k]
+        top[np.argsort(-scores[top])]
+    exact_ms = (time.time() - start) / len(queries) * 1000
+    print(f"{'exact':>10} | recall@{args.k} 1.000 | {exact_ms:.3f} ms/query")
+
+    for nprobe in args.nprobe:
+        start = time.time()
+        for q in queries:
+            index.search(q, embeddings, k=args.k, nprobe=nprobe)
+        ann_ms = (time.time() - start) / len(queries) * 1000
+        recall = recall_at_k(index, embeddings, queries, k=args.k, nprobe=nprobe)
+        print(f"{'nprobe=' + str(nprobe):>10} | recall@{args.k} {recall:.3f} | {ann_ms:.3f} ms/query")
+
+
+def bench_quantization(args):
+    """Memory, latency and recall@k of int8/float16 first pass + exact re-rank vs full precision."""
+    embeddings = load_normalized_embeddings(args.embeddings)
+    queries = perturbed_queries(embeddings, args.queries)
+    k = args.k
+
+    start = time.time()
+    exact_top = [np.argpartition(-(embeddings @ q), k - 1)[:k] for q in queries]
+    exact_ms = (time.time() - start) / len(queries) * 1000
+    print(f"{'mode':>8} | {'memory':>10} | {'ms/query':>8} | recall@{k} (first pass) | recall@{k} (re-ranked)")
+    print(f"{'float32':>8} | {embeddings.nbytes / 1e6:>7.1f} MB | {exact_ms:>8.3f} | {1.0:>20.3f} | {1.0:>20.3f}")
+
+    for mode in QUANTIZATION_MODES:
+        quantized = QuantizedEmbeddings.quantize(embeddings, mode)
+        hits_first = hits_reranked = 0
+        start = time.time()
+        for q, true_ids in zip(queries, exact_top):
+            approx = quantized.scores(q[None, :])[0]
+            n_rerank = min(args.rerank_depth, len(approx))
+            candidates = np.argpartition(-approx, n_rerank - 1)[:n_rerank]
+            exact = embeddings[candidates] @ q
+            reranked = candidates[np.argpartition(-exact, k - 1)[:k]]
+            hits_reranked += len(np.intersect1d(reranked, true_ids))
+            hits_first += len(np.intersect1d(np.argpartition(-approx, k - 1)[:k], true_ids))
+        quant_ms = (time.time() - start) / len(queries) * 1000
+        total = len(queries) * k
+        print(f"{mode:>8} | {quantized.nbytes / 1e6:>7.1f} MB | {quant_ms:>8.3f} | "
+              f"{hits_first / total:>20.3f} | {hits_reranked / total:>20.3f}")
+    print("memory = resident matrix; the engine keeps float32 memory-mapped for re-ranking in the quantized modes")
+
+
+def clear_query_caches(engine):
+    """Forget cached query embeddings, results and rankings, so a timed pass starts cold."""
+    engine.embedding_cache.clear()
+    engine.result_cache.clear()
+    engine.ranking_cache.clear()
+
+
+def bench_search_many(args):
+    """Throughput of batched search_many vs a per-query search loop, each from cold query caches."""
+    engine = load_engine(args)
+    queries = sample_queries(engine, args.queries)
+
+    clear_query_caches(engine)
+    start = time.time()
+    looped = [engine.search(q, top_k=args.k) for q in queries]
+    loop_s = time.time() - start
+
+    # Otherwise search_many would find every query embedding cached by the loop and never encode
+    clear_query_caches(engine)
+    start = time.time()
+    batched = engine.search_many(queries, top_k=args.k)
+    batch_s = time.time() - start
+
+    same = sum([r['title'] for r in a] == [r['title'] for r in b] for a, b in zip(looped, batched))
+    print(f"{len(queries)} queries, top_k={args.k}")
+    print(f"  per-query loop: {loop_s:.2f}s ({len(queries) / loop_s:.1f} queries/s)")
+    print(f"  search_many:    {batch_s:.2f}s ({len(queries) / batch_s:.1f} queries/s)")
+    print(f"  speed-up {loop_s / batch_s:.1f}x, identical rankings for {same}/{len(queries)} queries")
+
+
+def concurrent_load(encode, queries, n_clients, requests_per_client):
+    """`n_clients` threads each encode `requests_per_client` single queries; returns (queries/s, latencies)."""
+    latencies = [[] for _ in range(n_clients)]
+
+    def client(i):
+        for j in range(requests_per_client):
+            start = time.perf_counter()
+            encode([queries[(i * requests_per_client + j) % len(queries)]])
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return n_clients * requests_per_client / elapsed, np.concatenate(latencies)
+
+
+def bench_embedding_service(args):
+    """Single-query encode throughput/latency under concurrent load: direct model vs micro-batched vs socket."""
+    from sentence_transformers import SentenceTransformer
+    from shared.embedding_service import EmbeddingServer, MicroBatchEncoder, RemoteEncoder
+
+    model = SentenceTransformer(args.model)
+    queries = [f"query {i} about transformers for {topic}" for i, topic in
+               enumerate(["graph neural networks", "protein folding", "image segmentation", "speech recognition"] * 64)]
+    batcher = MicroBatchEncoder(model, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    socket_path = os.path.join(tempfile.mkdtemp(), "embedding.sock")
+    server = EmbeddingServer(socket_path, args.model, max_batch_size=args.max_batch_size,
+                             max_wait_ms=args.max_wait_ms, model=model)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    remote = RemoteEncoder(socket_path, args.model)
+
+    modes = [('direct', lambda texts: model.encode(texts, batch_size=1)), ('micro-batch', batcher.encode),
+             ('socket', remote.encode)]
+    print(f"{args.requests} single-query encodes per client, batch ≤ {args.max_batch_size}, "
+          f"wait ≤ {args.max_wait_ms} ms")
+    print(f"{'clients':>7} | {'mode':>11} | {'queries/s':>9} | {'p50 ms':>7} | {'p95 ms':>7} | mean batch")
+    for n_clients in args.clients:
+        for name, encode in modes:
+            encoder = server.encoder if name == 'socket' else batcher
+            before = encoder.stats()
+            throughput, latencies = concurrent_load(encode, queries, n_clients, args.requests)
+            after = encoder.stats()
+            batches = after['batches'] - before['batches']
+            mean_batch = f"{(after['texts'] - before['texts']) / batches:.1f}" if name != 'direct' and batches else "1.0"
+            print(f"{n_clients:>7} | {name:>11} | {throughput:>9.1f} | {np.percentile(latencies, 50) * 1000:>7.2f} | "
+                  f"{np.percentile(latencies, 95) * 1000:>7.2f} | {mean_batch}")
+    server.shutdown()
+    server.server_close()
+    os.remove(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", default=EMBEDDINGS_PATH)
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--bundle", default=BUNDLE_DIR)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ann = sub.add_parser("ann", help="IVF recall@k / latency vs brute force")
+    ann.add_argument("--n-lists", type=int, default=None)
+    ann.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    ann.set_defaults(func=bench_ann)
+
+    quant = sub.add_parser("quantization", help="int8/float16 memory, latency and recall vs float32")
+    quant.add_argument("--rerank-depth", type=int, default=300)
+    quant.set_defaults(func=bench_quantization)
+
+    many = sub.add_parser("search-many", help="batched search_many vs per-query loop")
+    many.set_defaults(func=bench_search_many)
+
+    service = sub.add_parser("embedding-service", help="micro-batched encoder throughput/latency under concurrent load")
+    service.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    service.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 32])
+    service.add_argument("--requests", type=int, default=50, help="encodes per client")
+    service.add_argument("--max-batch-size", type=int, default=64)
+    service.add_argument("--max-wait-ms", type=float, default=5.0)
+    service.set_defaults(func=bench_embedding_service)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
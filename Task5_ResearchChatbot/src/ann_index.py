@@ -0,0 +1,115 @@
+import os
+import time
+import numpy as np
+
+
+class IVFIndex:
+    """Inverted-file (IVF) approximate nearest-neighbour index over normalised embeddings.
+
+    Papers are partitioned into `n_lists` clusters with spherical k-means. A query only
+    scores the papers inside its `nprobe` closest clusters, so `nprobe` is the
+    recall/latency knob (nprobe == n_lists gives the exact brute-force result).
+    """
+
+    def __init__(self, centroids, list_offsets, list_ids, nprobe=8):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.nprobe = nprobe
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    @property
+    def n_docs(self):
+        return len(self.list_ids)
+
+    @classmethod
+    def build(cls, embeddings, n_lists=None, n_iter=10, sample_size=100_000, nprobe=8, seed=42):
+        n_docs = len(embeddings)
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(n_docs)))
+        n_lists = min(n_lists, n_docs)
+
+        # Train centroids on a sample so building stays cheap for large corpora
+        rng = np.random.default_rng(seed)
+        sample_idx = rng.choice(n_docs, size=min(sample_size, n_docs), replace=False)
+        sample = np.asarray(embeddings[np.sort(sample_idx)], dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+
+        for _ in range(n_iter):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[labels == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+
+        return cls.from_centroids(centroids, embeddings, nprobe=nprobe)
+
+    @classmethod
+    def from_centroids(cls, centroids, embeddings, nprobe=8):
+        """Assign every paper to its closest existing centroid (no k-means), in chunks to bound memory."""
+        assignments = np.concatenate([
+            np.argmax(np.asarray(embeddings[start:start + 65536], dtype=np.float32) @ centroids.T, axis=1)
+            for start in range(0, len(embeddings), 65536)
+        ] or [np.empty(0, dtype=np.int64)])
+        list_ids = np.argsort(assignments, kind='stable').astype(np.int64)
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=len(centroids)))]).astype(np.int64)
+        return cls(centroids, list_offsets, list_ids, nprobe=nprobe)
+
+    def candidates(self, query_emb, nprobe=None):
+        """Return ids of all papers stored in the `nprobe` lists closest to the query."""
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        centroid_scores = self.centroids @ query_emb
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        return np.concatenate([self.list_ids[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probe])
+
+    def search(self, query_emb, embeddings, k=5, nprobe=None):
+        """Approximate top-k (ids, scores) by inner product over the probed lists."""
+        ids = self.candidates(query_emb, nprobe)
+        scores = embeddings[ids] @ query_emb
+        if len(ids) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[top], scores[top]
+        order = np.argsort(-scores)
+        return ids[order], scores[order]
+
+    def save(self, path):
+        np.savez(path, centroids=self.centroids, list_offsets=self.list_offsets, list_ids=self.list_ids)
+
+    @classmethod
+    def load(cls, path, nprobe=8):
+        data = np.load(path)
+        return cls(data['centroids'], data['list_offsets'], data['list_ids'], nprobe=nprobe)
+
+
+def ann_index_path(embeddings_path):
+    """models/paper_embeddings.npy -> models/paper_embeddings.ivf.npz"""
+    return os.path.splitext(embeddings_path)[0] + '.ivf.npz'
+
+
+def load_or_build_ann_index(embeddings_path, embeddings, nprobe=8, n_lists=None):
+    """Load the IVF index saved next to the embeddings, (re)building it if missing or stale."""
+    path = ann_index_path(embeddings_path)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(embeddings_path):
+        index = IVFIndex.load(path, nprobe=nprobe)
+        if index.n_docs == len(embeddings):
+            return index
+
+    start = time.time()
+    index = IVFIndex.build(embeddings, n_lists=n_lists, nprobe=nprobe)
+    index.save(path)
+    print(f"✅ Built IVF index with {index.n_lists} lists in {time.time() - start:.2f}s -> {path}")
+    return index
+
+
+def recall_at_k(index, embeddings, queries, k=5, nprobe=None):
+    """Fraction of the exact brute-force top-k that the ANN index also returns."""
+    exact = np.argpartition(-(queries @ embeddings.T), k - 1, axis=1)[:, :k]
+    hits = 0
+    for query_emb, true_ids in zip(queries, exact):
+        approx_ids, _ = index.search(query_emb, embeddings, k=k, nprobe=nprobe)
+        hits += len(np.intersect1d(approx_ids, true_ids))
+    return hits / (len(queries) * k)
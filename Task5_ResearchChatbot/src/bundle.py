@@ -0,0 +1,152 @@
+"""Offline "build index" step for PaperSearchEngine.
+
+Writes a versioned, memory-mappable search bundle so the engine can start without
+re-reading the CSV or re-fitting TF-IDF:
+
+    python -m src.bundle --embeddings models/paper_embeddings.npy \
+        --csv data/arxiv_subset.csv --out models/search_bundle
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from src.lexical_index import InvertedIndex
+
+BUNDLE_VERSION = 1
+
+
+class StringColumn:
+    """Read-only column of strings stored as one UTF-8 blob plus an offsets array."""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        return bytes(self.blob[self.offsets[idx]:self.offsets[idx + 1]]).decode('utf-8')
+
+    def take(self, ids):
+        return np.array([self[i] for i in ids], dtype=object)
+
+    @staticmethod
+    def write(values, path_prefix):
+        encoded = [('' if pd.isna(v) else str(v)).encode('utf-8') for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        with open(path_prefix + '.bin', 'wb') as f:
+            for e in encoded:
+                f.write(e)
+        np.save(path_prefix + '.offsets.npy', offsets)
+
+    @classmethod
+    def open(cls, path_prefix):
+        offsets = np.load(path_prefix + '.offsets.npy', mmap_mode='r')
+        blob = np.memmap(path_prefix + '.bin', dtype=np.uint8, mode='r') if offsets[-1] else np.empty(0, np.uint8)
+        return cls(blob, offsets)
+
+
+def file_fingerprint(path):
+    """Cheap change detector for source files: (size, mtime)."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def build_bundle(embeddings_path, csv_path, out_dir, lexical='tfidf', max_features=5000):
+    """Build the bundle into a temp folder, then swap it in so readers never see half a bundle."""
+    start = time.time()
+    tmp_dir = out_dir.rstrip('/\\') + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_dir, 'columns'))
+
+    df = pd.read_csv(csv_path)
+    text = df['title'].fillna('') + ". " + df['abstract'].fillna('')
+
+    # Pre-normalised float32 embeddings
+    embeddings = np.load(embeddings_path).astype(np.float32)
+    if len(embeddings) != len(df):
+        raise ValueError(f"{embeddings_path} has {len(embeddings)} rows but {csv_path} has {len(df)}")
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    np.save(os.path.join(tmp_dir, 'embeddings.npy'), embeddings)
+
+    # Fitted TF-IDF vocabulary + idf, and the sparse matrix stored as posting lists
+    vectorizer = TfidfVectorizer(stop_words='english', max_features=max_features)
+    tfidf_matrix = vectorizer.fit_transform(text)
+    with open(os.path.join(tmp_dir, 'vocabulary.json'), 'w') as f:
+        json.dump({term: int(i) for term, i in vectorizer.vocabulary_.items()}, f)
+    np.save(os.path.join(tmp_dir, 'idf.npy'), vectorizer.idf_)
+    if lexical == 'bm25':
+        counts = CountVectorizer(stop_words='english', vocabulary=vectorizer.vocabulary_).transform(text)
+        lexical_index = InvertedIndex.from_bm25(counts)
+    else:
+        lexical_index = InvertedIndex.from_tfidf(tfidf_matrix)
+    lexical_index.save(os.path.join(tmp_dir, 'postings'))
+
+    # Columnar metadata
+    for column in df.columns:
+        StringColumn.write(df[column].tolist(), os.path.join(tmp_dir, 'columns', column))
+
+    manifest = {
+        'version': BUNDLE_VERSION,
+        'n_docs': len(df),
+        'dim': int(embeddings.shape[1]),
+        'lexical': lexical,
+        'columns': list(df.columns),
+        'sources': {
+            'csv': file_fingerprint(csv_path),
+            'embeddings': file_fingerprint(embeddings_path),
+        },
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    print(f"✅ Built search bundle for {len(df)} papers in {time.time() - start:.2f}s -> {out_dir}")
+    return manifest
+
+
+def load_bundle(bundle_dir):
+    """Open a bundle zero-copy: every array is memory-mapped and shared between processes."""
+    with open(os.path.join(bundle_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != BUNDLE_VERSION:
+        raise ValueError(f"Bundle {bundle_dir} has version {manifest.get('version')}, expected {BUNDLE_VERSION}. "
+                         "Rebuild it with `python -m src.bundle`.")
+
+    with open(os.path.join(bundle_dir, 'vocabulary.json')) as f:
+        vocabulary = json.load(f)
+    vectorizer = TfidfVectorizer(stop_words='english', vocabulary=vocabulary)
+    vectorizer.idf_ = np.load(os.path.join(bundle_dir, 'idf.npy'))
+
+    return {
+        'manifest': manifest,
+        'manifest_path': os.path.join(bundle_dir, 'manifest.json'),
+        'embeddings_path': os.path.join(bundle_dir, 'embeddings.npy'),
+        'embeddings': np.load(os.path.join(bundle_dir, 'embeddings.npy'), mmap_mode='r'),
+        'vectorizer': vectorizer,
+        'lexical_index': InvertedIndex.load(os.path.join(bundle_dir, 'postings')),
+        'columns': {c: StringColumn.open(os.path.join(bundle_dir, 'columns', c)) for c in manifest['columns']},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", default="models/paper_embeddings.npy")
+    parser.add_argument("--csv", default="data/arxiv_subset.csv")
+    parser.add_argument("--out", default="models/search_bundle")
+    parser.add_argument("--lexical", choices=["tfidf", "bm25"], default="tfidf")
+    parser.add_argument("--max-features", type=int, default=5000)
+    args = parser.parse_args()
+    build_bundle(args.embeddings, args.csv, args.out, lexical=args.lexical, max_features=args.max_features)
+
+
+if __name__ == "__main__":
+    main()
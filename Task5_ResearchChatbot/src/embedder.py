@@ -1,65 +1,180 @@
-import streamlit as st
-from src.search_engine import PaperSearchEngine
-
-st.set_page_config(
-    page_title="Research Paper Search Chatbot",
-    layout="wide",
-    initial_sidebar_state="expanded",
-)
-
-# Sidebar info
-with st.sidebar:
-    st.header("🔍 About")
-    st.write(
-        """
-        This app helps you find relevant academic papers using semantic search powered by SentenceTransformer embeddings.
-        Enter your research keywords or questions below and get the top matching papers with abstracts.
-        """
-    )
-    st.markdown("---")
-    st.header("Tips")
-    st.write(
-        """
-        - Use clear and concise queries.
-        - Try different keyword combinations for better results.
-        - Scroll through results for more insights.
-        """
-    )
-
-@st.cache_data(show_spinner=True)
-def load_search_engine():
-    embeddings_path = "models/paper_embeddings.npy"
-    csv_path = "data/arxiv_subset.csv"
-    return PaperSearchEngine(embeddings_path, csv_path, alpha=0.6)  # You can tune alpha here
-
-search_engine = load_search_engine()
-
-st.title("🔍 Research Paper Search Chatbot")
-st.markdown(
-    """
-    Enter your research query below to find the most relevant academic papers.
-    Powered by semantic search using SentenceTransformer embeddings.
-    """
-)
-
-with st.form("search_form"):
-    query = st.text_input("Enter keywords or question", max_chars=150, placeholder="E.g., machine learning applications in healthcare")
-    submitted = st.form_submit_button("Search")
-
-if submitted and query.strip():
-    with st.spinner("Searching for relevant papers..."):
-        results = search_engine.search(query.strip(), top_k=5)
-
-    if results:
-        st.success(f"Found {len(results)} relevant papers:")
-        for i, paper in enumerate(results, start=1):
-            st.markdown(f"### {i}. {paper['title']}")
-            authors = paper.get('authors', 'N/A')
-            st.markdown(f"**Authors:** {authors}")
-            st.write(paper['abstract'])
-            st.markdown(f"**Relevance Score:** {paper['score']:.4f}")
-            st.markdown("---")
+"""Offline embedding builder for the arXiv corpus.
+
+Streams the CSV in chunks, encodes paper text in large batches across a process pool and
+writes normalised float32 embeddings into a memory-mapped .npy file:
+
+    python -m src.embedder --csv data/arxiv_subset.csv --out models/paper_embeddings.npy
+
+A checkpoint is written after every chunk, so re-running the same command after a crash
+resumes where it stopped. Rows whose text hash already has an embedding in the previous
+output (or earlier in the same run) are copied instead of re-encoded.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+
+_worker_model = None
+
+
+def _init_worker(model_name):
+    # Each worker process loads the model once
+    global _worker_model
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _encode_batch(texts):
+    embeddings = _worker_model.encode(texts, batch_size=len(texts), show_progress_bar=False)
+    return embeddings.astype(np.float32)
+
+
+def paper_text(df):
+    """Same text the search engine indexes: title + abstract."""
+    return (df['title'].fillna('') + ". " + df['abstract'].fillna('')).tolist()
+
+
+def text_hash(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def hashes_path(out_path):
+    return os.path.splitext(out_path)[0] + '.hashes.npy'
+
+
+def count_rows(csv_path, chunk_rows):
+    try:
+        return sum(len(chunk) for chunk in pd.read_csv(csv_path, usecols=['title'], chunksize=chunk_rows))
+    except pd.errors.EmptyDataError:  # a completely empty file, not even a header
+        return 0
+
+
+def load_previous_embeddings(out_path):
+    """text hash -> row of a previous output, so unchanged papers are never re-encoded."""
+    if not (os.path.exists(out_path) and os.path.exists(hashes_path(out_path))):
+        return None, {}
+    embeddings = np.load(out_path, mmap_mode='r')
+    hashes = np.load(hashes_path(out_path))
+    return embeddings, {h.tobytes(): row for row, h in enumerate(hashes)}
+
+
+def build_embeddings(csv_path, out_path, model_name=MODEL_NAME, chunk_rows=10000, batch_size=256, workers=2):
+    start = time.time()
+    partial_path = out_path + '.partial.npy'
+    partial_hashes_path = out_path + '.partial.hashes.npy'
+    checkpoint_path = out_path + '.checkpoint.json'
+    source = {'csv': os.path.abspath(csv_path), 'size': os.path.getsize(csv_path),
+              'mtime': os.path.getmtime(csv_path), 'model': model_name}
+
+    # Resume only if the checkpoint belongs to the same CSV and model
+    checkpoint = None
+    if os.path.exists(checkpoint_path) and os.path.exists(partial_path):
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('source') != source:
+            checkpoint = None
+
+    # hash -> row already written in this run (including the resumed part)
+    written = {}
+    if checkpoint:
+        output = np.load(partial_path, mmap_mode='r+')
+        hashes = np.load(partial_hashes_path, mmap_mode='r+')
+        rows_done = checkpoint['rows_done']
+        for row in range(rows_done):
+            written.setdefault(hashes[row].tobytes(), row)
+        print(f"🔁 Resuming from row {rows_done}/{len(output)}")
     else:
-        st.warning("No relevant papers found. Try refining your query.")
-else:
-    st.info("Please enter a query to start searching.")
+        n_rows = count_rows(csv_path, chunk_rows)
+        if n_rows == 0:
+            # Nothing to encode, and an empty corpus could not be searched anyway
+            raise ValueError(f"{csv_path} has no papers to embed")
+        rows_done = 0
+        output = hashes = None
+
+    previous_embeddings, previous = load_previous_embeddings(out_path)
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_name,)) if workers else None
+    if pool is None:
+        _init_worker(model_name)
+    encoded_count = reused_count = 0
+
+    try:
+        row = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            if row + len(chunk) <= rows_done:
+                row += len(chunk)
+                continue
+            skip = max(rows_done - row, 0)
+            row += skip
+            texts = paper_text(chunk)[skip:]
+            chunk_hashes = [text_hash(t) for t in texts]
+
+            # Encode only texts that have no embedding yet (deduplicated within the chunk)
+            to_encode = {}
+            for h, text in zip(chunk_hashes, texts):
+                if h not in written and h not in previous:
+                    to_encode.setdefault(h, text)
+            texts_to_encode = list(to_encode.values())
+            batches = [texts_to_encode[i:i + batch_size] for i in range(0, len(texts_to_encode), batch_size)]
+            encoded = list(pool.map(_encode_batch, batches) if pool else map(_encode_batch, batches))
+            fresh = dict(zip(to_encode, np.concatenate(encoded))) if encoded else {}
+
+            if output is None:
+                dim = len(next(iter(fresh.values()))) if fresh else previous_embeddings.shape[1]
+                output = np.lib.format.open_memmap(partial_path, mode='w+', dtype=np.float32, shape=(n_rows, dim))
+                hashes = np.lib.format.open_memmap(partial_hashes_path, mode='w+', dtype=np.uint8, shape=(n_rows, 16))
+
+            for offset, h in enumerate(chunk_hashes):
+                if h in fresh:
+                    emb = fresh[h]
+                    output[row + offset] = emb / np.linalg.norm(emb)
+                elif h in written:
+                    output[row + offset] = output[written[h]]
+                else:
+                    output[row + offset] = previous_embeddings[previous[h]]
+                hashes[row + offset] = np.frombuffer(h, dtype=np.uint8)
+                written.setdefault(h, row + offset)
+            encoded_count += len(fresh)
+            reused_count += len(chunk_hashes) - len(fresh)
+            row += len(chunk_hashes)
+
+            # Checkpoint: flush data first, then atomically record progress
+            output.flush()
+            hashes.flush()
+            with open(checkpoint_path + '.tmp', 'w') as f:
+                json.dump({'source': source, 'rows_done': row}, f)
+            os.replace(checkpoint_path + '.tmp', checkpoint_path)
+            elapsed = time.time() - start
+            print(f"🧠 {row}/{len(output)} rows ({encoded_count} encoded, {reused_count} reused) "
+                  f"- {encoded_count / max(elapsed, 1e-9):.1f} papers/s")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    del output, hashes, previous_embeddings
+    os.replace(partial_path, out_path)
+    os.replace(partial_hashes_path, hashes_path(out_path))
+    os.remove(checkpoint_path)
+    print(f"✅ Embeddings written to {out_path} in {time.time() - start:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default="data/arxiv_subset.csv")
+    parser.add_argument("--out", default="models/paper_embeddings.npy")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--chunk-rows", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=2, help="encoder processes (0 = encode in this process)")
+    args = parser.parse_args()
+    build_embeddings(args.csv, args.out, model_name=args.model, chunk_rows=args.chunk_rows,
+                     batch_size=args.batch_size, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
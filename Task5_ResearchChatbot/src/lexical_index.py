@@ -0,0 +1,142 @@
+import json
+import os
+import numpy as np
+import scipy.sparse as sp
+
+
+class InvertedIndex:
+    """Posting-list index over a sparse document-term weight matrix.
+
+    Each term keeps the (sorted) ids of the papers that contain it plus the paper's weight
+    for that term. A query only touches the postings of its own terms, and `top_k` stops
+    admitting new papers as soon as the remaining terms can no longer lift an unseen paper
+    into the top-k (MaxScore-style early termination).
+    """
+
+    def __init__(self, doc_term_matrix, normalize_scores=False):
+        csc = sp.csc_matrix(doc_term_matrix, dtype=np.float32)
+        csc.sort_indices()
+        self.n_docs = csc.shape[0]
+        self.indptr = csc.indptr
+        self.doc_ids = csc.indices
+        self.weights = csc.data
+        self.max_weights = np.zeros(csc.shape[1], dtype=np.float32)
+        non_empty = np.diff(self.indptr) > 0
+        self.max_weights[non_empty] = np.maximum.reduceat(self.weights, self.indptr[:-1][non_empty])
+        # BM25 scores are unbounded; rescale them to [0, 1] so alpha keeps its meaning
+        self.normalize_scores = normalize_scores
+        # Corpus statistics (BM25 only) so new segments are weighted like the original corpus
+        self.bm25_stats = None
+
+    @classmethod
+    def from_tfidf(cls, tfidf_matrix):
+        """Rows are L2-normalised TF-IDF vectors, so query scores equal cosine similarity."""
+        return cls(tfidf_matrix)
+
+    @classmethod
+    def from_bm25(cls, count_matrix, k1=1.2, b=0.75, stats=None):
+        """BM25 weights; pass `stats` (idf, avg_len) of an existing index to reuse its corpus statistics."""
+        counts = sp.csr_matrix(count_matrix, dtype=np.float32)
+        doc_len = np.asarray(counts.sum(axis=1)).ravel()
+        if stats is None:
+            avg_len = float(doc_len.mean()) if len(doc_len) else 0.0
+            df = np.bincount(counts.indices, minlength=counts.shape[1])
+            idf = np.log(1 + (counts.shape[0] - df + 0.5) / (df + 0.5)).astype(np.float32)
+        else:
+            idf, avg_len = np.asarray(stats['idf'], dtype=np.float32), stats['avg_len']
+
+        weights = counts.copy()
+        row_len = np.repeat(doc_len, np.diff(counts.indptr))
+        tf = weights.data
+        weights.data = idf[weights.indices] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * row_len / max(avg_len, 1e-9)))
+        index = cls(weights, normalize_scores=True)
+        index.bm25_stats = {'idf': idf.tolist(), 'avg_len': avg_len}
+        return index
+
+    def save(self, directory):
+        """Write the posting arrays as plain .npy files so they can be memory-mapped."""
+        os.makedirs(directory, exist_ok=True)
+        for name in ('indptr', 'doc_ids', 'weights', 'max_weights'):
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'n_docs': int(self.n_docs), 'normalize_scores': self.normalize_scores,
+                       'bm25_stats': self.bm25_stats}, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        index = cls.__new__(cls)
+        for name in ('indptr', 'doc_ids', 'weights', 'max_weights'):
+            setattr(index, name, np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode))
+        index.n_docs = meta['n_docs']
+        index.normalize_scores = meta['normalize_scores']
+        index.bm25_stats = meta.get('bm25_stats')
+        return index
+
+    def doc_term_matrix(self):
+        """The (n_docs, n_terms) weight matrix, viewed over the posting arrays without copying."""
+        return sp.csc_matrix((self.weights, self.doc_ids, self.indptr), shape=(self.n_docs, len(self.indptr) - 1))
+
+    def postings(self, term_id):
+        start, end = self.indptr[term_id], self.indptr[term_id + 1]
+        return self.doc_ids[start:end], self.weights[start:end]
+
+    def score(self, doc_ids, term_ids, query_weights):
+        """Exact lexical scores for the given papers (doc_ids must be sorted)."""
+        scores = np.zeros(len(doc_ids), dtype=np.float32)
+        for term_id, q_weight in zip(term_ids, query_weights):
+            ids, weights = self.postings(term_id)
+            if len(ids):
+                pos = np.minimum(np.searchsorted(ids, doc_ids), len(ids) - 1)
+                hit = ids[pos] == doc_ids
+                scores[hit] += q_weight * weights[pos[hit]]
+        return scores
+
+    def score_many(self, query_matrix):
+        """Dense (n_queries, n_docs) lexical scores for a batch of sparse queries in one sparse product."""
+        return (sp.csr_matrix(query_matrix, dtype=np.float32) @ self.doc_term_matrix().T).toarray()
+
+    def top_k(self, term_ids, query_weights, k=100):
+        """Top-k (doc_ids, scores) for a sparse query, visiting only the query's postings."""
+        term_ids = np.asarray(term_ids)
+        query_weights = np.asarray(query_weights, dtype=np.float32)
+        if not len(term_ids):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # Process high-impact terms first; remaining[i] bounds what terms i.. can still add
+        bounds = query_weights * self.max_weights[term_ids]
+        order = np.argsort(-bounds)
+        term_ids, query_weights = term_ids[order], query_weights[order]
+        remaining = np.append(np.cumsum(bounds[order][::-1])[::-1], 0.0)
+
+        cand_ids = np.empty(0, dtype=np.int64)
+        cand_scores = np.empty(0, dtype=np.float32)
+        i = 0
+        while i < len(term_ids):
+            ids, weights = self.postings(term_ids[i])
+            merged, inverse = np.unique(np.concatenate([cand_ids, ids]), return_inverse=True)
+            cand_scores = np.bincount(inverse, weights=np.concatenate([cand_scores, query_weights[i] * weights]),
+                                      minlength=len(merged)).astype(np.float32)
+            cand_ids = merged
+            i += 1
+            if len(cand_ids) >= k and _kth_largest(cand_scores, k) >= remaining[i]:
+                break
+
+        # Unseen papers can no longer reach the top-k: only refine existing candidates
+        for j in range(i, len(term_ids)):
+            alive = cand_scores + remaining[j] >= _kth_largest(cand_scores, k)
+            cand_ids, cand_scores = cand_ids[alive], cand_scores[alive]
+            cand_scores += self.score(cand_ids, term_ids[j:j + 1], query_weights[j:j + 1])
+
+        if len(cand_ids) > k:
+            top = np.argpartition(-cand_scores, k - 1)[:k]
+            cand_ids, cand_scores = cand_ids[top], cand_scores[top]
+        order = np.argsort(-cand_scores)
+        return cand_ids[order], cand_scores[order]
+
+
+def _kth_largest(values, k):
+    if len(values) < k:
+        return 0.0
+    return np.partition(values, len(values) - k)[len(values) - k]
@@ -0,0 +1,111 @@
+import re
+import threading
+import numpy as np
+
+FILTER_COLUMNS = ('authors', 'category', 'year')
+
+
+def _split_authors(value):
+    return [a for a in (normalize_value(a) for a in re.split(r',|;|\band\b', value)) if a]
+
+
+def _split_categories(value):
+    return [c for c in normalize_value(value).split(' ') if c]
+
+
+def _parse_year(value):
+    try:
+        year = float(value)
+    except (TypeError, ValueError):
+        return -1
+    return int(year) if np.isfinite(year) else -1
+
+
+def normalize_value(value):
+    return ' '.join(str(value).lower().split())
+
+
+class FilterIndex:
+    """Precomputed indexes over the metadata columns of one segment.
+
+    authors and category map every (normalised) value to the sorted ids of the papers that
+    carry it; year is kept as a sorted array so ranges are two binary searches. Each column
+    is indexed the first time a query filters on it and then reused by every later query.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.n_docs = len(next(iter(columns.values()))) if columns else 0
+        self._postings = {}
+        self._years = None
+        self._lock = threading.Lock()
+
+    def _value_postings(self, name):
+        if name not in self._postings:
+            with self._lock:
+                if name not in self._postings:
+                    split = _split_authors if name == 'authors' else _split_categories
+                    postings = {}
+                    column = self.columns[name]
+                    for idx in range(self.n_docs):
+                        value = column[idx]
+                        if isinstance(value, str):
+                            for key in set(split(value)):
+                                postings.setdefault(key, []).append(idx)
+                    self._postings[name] = {key: np.array(ids, dtype=np.int64) for key, ids in postings.items()}
+        return self._postings[name]
+
+    def _sorted_years(self):
+        if self._years is None:
+            with self._lock:
+                if self._years is None:
+                    column = self.columns['year']
+                    years = np.array([_parse_year(column[idx]) for idx in range(self.n_docs)], dtype=np.int64)
+                    order = np.argsort(years, kind='stable')
+                    self._years = (years[order], order)
+        return self._years
+
+    def mask(self, filters):
+        """Boolean mask of the papers matching every filter (AND across columns, OR within a list)."""
+        mask = np.ones(self.n_docs, dtype=bool)
+        for name, wanted in filters.items():
+            if name not in FILTER_COLUMNS:
+                raise ValueError(f"Cannot filter on {name!r}, expected one of {FILTER_COLUMNS}")
+            if name not in self.columns:
+                raise ValueError(f"Cannot filter on {name!r}: the corpus has no {name!r} column")
+            column_mask = np.zeros(self.n_docs, dtype=bool)
+            if name == 'year':
+                years, order = self._sorted_years()
+                # (start, end) is an inclusive range where either end may be None; otherwise one year or a list
+                if isinstance(wanted, tuple):
+                    start, end = wanted
+                    lo = 0 if start is None else np.searchsorted(years, start, side='left')
+                    hi = len(years) if end is None else np.searchsorted(years, end, side='right')
+                    column_mask[order[lo:hi]] = True
+                else:
+                    for year in np.atleast_1d(wanted):
+                        lo, hi = np.searchsorted(years, int(year), side='left'), np.searchsorted(years, int(year), side='right')
+                        column_mask[order[lo:hi]] = True
+            else:
+                postings = self._value_postings(name)
+                for value in ([wanted] if isinstance(wanted, str) else wanted):
+                    ids = postings.get(normalize_value(value))
+                    if ids is not None:
+                        column_mask[ids] = True
+            mask &= column_mask
+        return mask
+
+
+def filters_key(filters):
+    """Hashable, order-independent form of a filters dict for cache keys."""
+    if not filters:
+        return None
+    key = []
+    for name, wanted in sorted(filters.items()):
+        if isinstance(wanted, tuple):
+            key.append((name, 'range', wanted))
+        elif isinstance(wanted, (str, int, np.integer)):
+            key.append((name, 'any', (normalize_value(wanted),)))
+        else:
+            key.append((name, 'any', tuple(sorted(normalize_value(v) for v in wanted))))
+    return tuple(key)
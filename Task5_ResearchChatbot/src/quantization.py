@@ -0,0 +1,105 @@
+import os
+import time
+import numpy as np
+
+QUANTIZATION_MODES = ('int8', 'float16')
+
+
+class QuantizedEmbeddings:
+    """Compact copy of the normalised embeddings used for first-pass scoring.
+
+    'float16' halves the memory, 'int8' (scalar quantisation with one scale per dimension)
+    quarters it. Scores are approximate, so callers re-score the best candidates exactly
+    against the full-precision embeddings.
+    """
+
+    def __init__(self, codes, scales=None):
+        self.codes = codes
+        self.scales = scales
+
+    @property
+    def mode(self):
+        return 'int8' if self.codes.dtype == np.int8 else 'float16'
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def quantize(cls, embeddings, mode='int8', chunk_size=65536):
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode {mode!r}, expected one of {QUANTIZATION_MODES}")
+        n_docs = len(embeddings)
+        if mode == 'float16':
+            codes = np.empty(embeddings.shape, dtype=np.float16)
+            for start in range(0, n_docs, chunk_size):
+                codes[start:start + chunk_size] = embeddings[start:start + chunk_size]
+            return cls(codes)
+
+        scales = np.zeros(embeddings.shape[1], dtype=np.float32)
+        for start in range(0, n_docs, chunk_size):
+            scales = np.maximum(scales, np.abs(embeddings[start:start + chunk_size]).max(axis=0))
+        scales = np.where(scales > 0, scales / 127.0, 1.0).astype(np.float32)
+        codes = np.empty(embeddings.shape, dtype=np.int8)
+        for start in range(0, n_docs, chunk_size):
+            codes[start:start + chunk_size] = np.round(embeddings[start:start + chunk_size] / scales)
+        return cls(codes, scales)
+
+    def scores(self, query_embs, chunk_size=2048):
+        """Approximate (n_queries, n_docs) inner products, decoding one cache-sized chunk at a time."""
+        query_embs = np.asarray(query_embs, dtype=np.float32)
+        weights = query_embs * self.scales if self.scales is not None else query_embs
+        out = np.empty((len(query_embs), len(self.codes)), dtype=np.float32)
+        for start in range(0, len(self.codes), chunk_size):
+            out[:, start:start + chunk_size] = weights @ self.codes[start:start + chunk_size].astype(np.float32).T
+        return out
+
+    def save(self, path_prefix):
+        np.save(path_prefix + '.npy', self.codes)
+        if self.scales is not None:
+            np.save(path_prefix + '.scales.npy', self.scales)
+
+    @classmethod
+    def load(cls, path_prefix, mmap_mode='r'):
+        codes = np.load(path_prefix + '.npy', mmap_mode=mmap_mode)
+        scales = np.load(path_prefix + '.scales.npy') if codes.dtype == np.int8 else None
+        return cls(codes, scales)
+
+
+def quantized_path_prefix(embeddings_path, mode):
+    """models/paper_embeddings.npy -> models/paper_embeddings.int8"""
+    return os.path.splitext(embeddings_path)[0] + '.' + mode
+
+
+def load_or_build_normalized(embeddings_path, embeddings):
+    """Memory-map the normalised float32 embeddings, writing them next to the originals if missing or stale.
+
+    With quantization the full-precision matrix is only read to re-rank a few hundred papers,
+    so it doesn't need to stay resident.
+    """
+    path = os.path.splitext(embeddings_path)[0] + '.normalized.npy'
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(embeddings_path):
+        normalized = np.load(path, mmap_mode='r')
+        if normalized.shape == embeddings.shape:
+            return normalized
+
+    np.save(path, np.asarray(embeddings, dtype=np.float32))
+    return np.load(path, mmap_mode='r')
+
+
+def load_or_build_quantized(embeddings_path, embeddings, mode='int8'):
+    """Load the quantized copy saved next to the embeddings, (re)building it if missing or stale."""
+    prefix = quantized_path_prefix(embeddings_path, mode)
+    if os.path.exists(prefix + '.npy') and os.path.getmtime(prefix + '.npy') >= os.path.getmtime(embeddings_path):
+        quantized = QuantizedEmbeddings.load(prefix)
+        if quantized.codes.shape == embeddings.shape:
+            return quantized
+
+    start = time.time()
+    quantized = QuantizedEmbeddings.quantize(embeddings, mode)
+    quantized.save(prefix)
+    print(f"✅ Built {mode} embeddings ({quantized.nbytes / 1e6:.1f} MB) in {time.time() - start:.2f}s -> {prefix}.npy")
+    return QuantizedEmbeddings.load(prefix)
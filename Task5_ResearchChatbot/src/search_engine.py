@@ -1,57 +1,335 @@
+import os
+import sys
+import threading
 import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from src.ann_index import load_or_build_ann_index
+from src.bundle import file_fingerprint, load_bundle
+from src.lexical_index import InvertedIndex
+from src.metadata_filter import FILTER_COLUMNS, filters_key
+from src.quantization import load_or_build_normalized, load_or_build_quantized
+from src.query_cache import LRUCache, normalize_query
+from src.segment import Segment
+
+# The shared embedding service lives in shared/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from shared.embedding_service import get_encoder
 
 class PaperSearchEngine:
-    def __init__(self, embeddings_path, csv_path, model_name='sentence-transformers/all-MiniLM-L6-v2', alpha=0.5):
+    def __init__(self, embeddings_path, csv_path, model_name='sentence-transformers/all-MiniLM-L6-v2', alpha=0.5,
+                 use_ann=False, nprobe=8, lexical='tfidf', candidate_depth=100, cache_size=1024, cache_ttl=3600,
+                 quantization=None, rerank_depth=300, max_segments=8, ranking_ttl=300, prefetch_pages=4):
         # Load paper metadata
-        self.df = pd.read_csv(csv_path)
-        self.df['text'] = self.df['title'].fillna('') + ". " + self.df['abstract'].fillna('')
+        df = pd.read_csv(csv_path)
+        df['text'] = df['title'].fillna('') + ". " + df['abstract'].fillna('')
+        columns = {column: df[column].to_numpy(dtype=object) for column in df.columns}
 
         # Load embeddings (should be normalized)
-        self.embeddings = np.load(embeddings_path)
-        self.embeddings = self.embeddings / np.linalg.norm(self.embeddings, axis=1, keepdims=True)
-
-        # Load SentenceTransformer model
-        self.model = SentenceTransformer(model_name)
+        embeddings = np.load(embeddings_path)
+        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        if quantization:
+            # Only the compact copy should be resident: re-ranking reads full precision from an mmap'd file
+            embeddings = load_or_build_normalized(embeddings_path, embeddings)
 
         # Setup TF-IDF vectorizer on paper text
         self.vectorizer = TfidfVectorizer(stop_words='english', max_features=5000)
-        self.tfidf_matrix = self.vectorizer.fit_transform(self.df['text'])
+        tfidf_matrix = self.vectorizer.fit_transform(df['text'])
+
+        # Posting lists for the lexical side: 'tfidf' keeps the exact cosine scores, 'bm25' is opt-in
+        if lexical == 'bm25':
+            self.query_vectorizer = CountVectorizer(stop_words='english', vocabulary=self.vectorizer.vocabulary_)
+            lexical_index = InvertedIndex.from_bm25(self.query_vectorizer.transform(df['text']))
+        else:
+            self.query_vectorizer = self.vectorizer
+            lexical_index = InvertedIndex.from_tfidf(tfidf_matrix)
+
+        self._setup(embeddings_path, embeddings, lexical_index, columns, [csv_path, embeddings_path], model_name,
+                    alpha, use_ann, nprobe, candidate_depth, cache_size, cache_ttl, quantization, rerank_depth,
+                    max_segments, ranking_ttl, prefetch_pages)
+
+    @classmethod
+    def from_bundle(cls, bundle_dir, model_name='sentence-transformers/all-MiniLM-L6-v2', alpha=0.5,
+                    use_ann=False, nprobe=8, candidate_depth=100, cache_size=1024, cache_ttl=3600,
+                    quantization=None, rerank_depth=300, max_segments=8, ranking_ttl=300, prefetch_pages=4):
+        """Open a prebuilt bundle (see src/bundle.py): no CSV parsing, no TF-IDF refit, mmap'd arrays."""
+        bundle = load_bundle(bundle_dir)
+        engine = cls.__new__(cls)
+        engine.vectorizer = bundle['vectorizer']
+        if bundle['manifest']['lexical'] == 'bm25':
+            engine.query_vectorizer = CountVectorizer(stop_words='english', vocabulary=engine.vectorizer.vocabulary)
+        else:
+            engine.query_vectorizer = engine.vectorizer
+        engine._setup(bundle['embeddings_path'], bundle['embeddings'], bundle['lexical_index'], bundle['columns'],
+                      [bundle['manifest_path']], model_name, alpha, use_ann, nprobe, candidate_depth, cache_size,
+                      cache_ttl, quantization, rerank_depth, max_segments, ranking_ttl, prefetch_pages)
+        return engine
+
+    def _setup(self, embeddings_path, embeddings, lexical_index, columns, source_paths, model_name, alpha, use_ann,
+               nprobe, candidate_depth, cache_size, cache_ttl, quantization, rerank_depth, max_segments,
+               ranking_ttl, prefetch_pages):
+        # Shared SentenceTransformer (loaded once per process, or served over EMBEDDING_SERVICE_SOCKET)
+        self.model = get_encoder(model_name)
+
+        # Number of lexical and semantic candidates fused per query
+        self.candidate_depth = candidate_depth
 
         # Alpha controls balance between tf-idf and semantic similarity (0 to 1)
         self.alpha = alpha
 
+        # Optional IVF index: nprobe trades recall for latency on large corpora
+        ann_index = load_or_build_ann_index(embeddings_path, embeddings, nprobe=nprobe) if use_ann else None
+
+        # Optional int8/float16 copy for first-pass scoring; the best `rerank_depth` papers are re-scored
+        # exactly. The full-precision embeddings stay memory-mapped (the bundle's, or a normalised copy
+        # written next to the CSV path's embeddings), so only the compact matrix is resident.
+        quantized = load_or_build_quantized(embeddings_path, embeddings, quantization) if quantization else None
+        self.rerank_depth = rerank_depth
+
+        # The corpus is a list of segments: the loaded corpus first, then papers added with add_papers().
+        # Writers swap in a new list under the lock; queries just read whatever list is current.
+        doc_ids = np.arange(len(embeddings), dtype=np.int64)
+        self.segments = [Segment(embeddings, lexical_index, columns, doc_ids, ann_index=ann_index, quantized=quantized)]
+        self.next_doc_id = len(embeddings)
+        self.max_segments = max_segments
+        self.generation = 0
+        self._write_lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._merge_thread = None
+
+        # Normalised query -> embedding, and (query, alpha, top_k, corpus version) -> results
+        self.source_paths = source_paths
+        self.embedding_cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+        self.result_cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+
+        # Short-lived (query, alpha, filters, corpus version) -> ranked hits, so later pages of the same
+        # query are sliced instead of re-scored. Each ranking covers `prefetch_pages` pages.
+        self.ranking_cache = LRUCache(maxsize=cache_size, ttl=ranking_ttl)
+        self.prefetch_pages = prefetch_pages
+        self._cache_version = self.corpus_version()
+
+    def corpus_version(self):
+        """(size, mtime) of the files the engine was built from; changes whenever they are rewritten."""
+        return tuple(tuple(file_fingerprint(path)) for path in self.source_paths)
+
+    def _check_corpus_version(self):
+        # Drop cached queries as soon as the underlying CSV / embeddings / bundle change on disk
+        version = self.corpus_version()
+        if version != self._cache_version:
+            self.embedding_cache.clear()
+            self.result_cache.clear()
+            self.ranking_cache.clear()
+            self._cache_version = version
+        # In-memory updates bump the generation, so cached results never outlive an add/delete
+        return version, self.generation
+
+    def filter_columns(self):
+        """The filterable columns (authors / category / year) this corpus actually has."""
+        return [name for name in FILTER_COLUMNS if name in self.segments[0].columns]
+
+    def cache_stats(self):
+        return {'embeddings': self.embedding_cache.stats(), 'results': self.result_cache.stats(),
+                'rankings': self.ranking_cache.stats()}
+
     def embed_query(self, query):
-        query_emb = self.model.encode([query])
-        query_emb = query_emb / np.linalg.norm(query_emb, axis=1, keepdims=True)
-        return query_emb
-
-    def search(self, query, top_k=5):
-        # Embeddings similarity
-        query_embedding = self.embed_query(query)
-        sem_scores = cosine_similarity(query_embedding, self.embeddings)[0]
-
-        # TF-IDF similarity
-        tfidf_query_vec = self.vectorizer.transform([query])
-        tfidf_scores = cosine_similarity(tfidf_query_vec, self.tfidf_matrix).flatten()
-
-        # Combine with weighted sum using alpha
-        combined_scores = self.alpha * tfidf_scores + (1 - self.alpha) * sem_scores
-
-        # Get top results indices
-        top_indices = combined_scores.argsort()[-top_k:][::-1]
-
-        results = []
-        for idx in top_indices:
-            results.append({
-                'title': self.df.iloc[idx]['title'],
-                'abstract': self.df.iloc[idx]['abstract'],
-                'score': combined_scores[idx],
-                'authors': self.df.iloc[idx].get('authors', 'N/A'),
-                # Remove year if mostly missing or comment this line out
-                # 'year': self.df.iloc[idx].get('year', 'N/A'),
-            })
+        return self.embed_queries([query])
+
+    def embed_queries(self, queries):
+        queries = [normalize_query(q) for q in queries]
+        cached = [self.embedding_cache.get(q) for q in queries]
+        missing = sorted({q for q, emb in zip(queries, cached) if emb is None})
+        if missing:
+            # One batched forward pass for all uncached queries
+            query_emb = self.model.encode(missing)
+            query_emb = query_emb / np.linalg.norm(query_emb, axis=1, keepdims=True)
+            for q, emb in zip(missing, query_emb):
+                self.embedding_cache.put(q, emb)
+            encoded = dict(zip(missing, query_emb))
+            cached = [encoded[q] if emb is None else emb for q, emb in zip(queries, cached)]
+        return np.stack(cached)
+
+    def search(self, query, top_k=5, filters=None, offset=0):
+        """Hybrid top-k search; `offset` skips that many results, e.g. offset=top_k for the second page.
+
+        `filters` restricts results by metadata, e.g. {'authors': 'Yann LeCun', 'category': ['cs.LG', 'cs.AI'],
+        'year': (2018, None)}: columns are ANDed, a list matches any of its values and a (start, end) tuple
+        is an inclusive year range. Filters are applied before top-k, so up to top_k matches are returned.
+        """
+        version = self._check_corpus_version()
+        query = normalize_query(query)
+        cache_key = (query, self.alpha, top_k, offset, filters_key(filters), version)
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return [dict(result) for result in cached]
+
+        hits = self._ranking(query, offset + top_k, offset + top_k * max(self.prefetch_pages, 1), filters, version)
+        results = self._build_results(hits[offset:offset + top_k])
+        self.result_cache.put(cache_key, results)
+        return [dict(result) for result in results]
+
+    def _ranking(self, query, depth, prefetch_depth, filters, version):
+        """Ranked (score, segment, row) hits at least `depth` deep (`prefetch_depth` when (re)computed)."""
+        ranking_key = (query, self.alpha, filters_key(filters), version)
+        cached = self.ranking_cache.get(ranking_key)
+        if cached is not None:
+            hits, complete = cached
+            if complete or len(hits) >= depth:
+                return hits
+        depth = prefetch_depth
+
+        query_vec = self.query_vectorizer.transform([query])
+        query_embedding = self.embed_query(query)[0]
+        segments = self.segments  # snapshot: updates swap the list, they never mutate it
+
+        # BM25 is rescaled by the best lexical score over the whole corpus, not per segment
+        lexical_norm = None
+        if segments[0].lexical_index.normalize_scores:
+            best = [seg.lexical_index.top_k(query_vec.indices, query_vec.data, k=1)[1] for seg in segments]
+            lexical_norm = max((b[0] for b in best if len(b)), default=0.0) or None
+
+        # Each segment returns its exact top-k; merging them by score gives the global top-k
+        hits = []
+        for seg in segments:
+            ids, scores = seg.search(query_vec, query_embedding, depth, self.alpha, self.candidate_depth,
+                                     self.rerank_depth, lexical_norm, filters)
+            hits.extend((score, seg, idx) for idx, score in zip(ids, scores))
+        hits.sort(key=lambda hit: -hit[0])
+        hits = hits[:depth]
+
+        self.ranking_cache.put(ranking_key, (hits, len(hits) < depth))
+        return hits
+
+    def search_many(self, queries, top_k=5, block_size=256, filters=None):
+        """Search a batch of queries at once; returns one `search`-style result list per query.
+
+        Queries are encoded in one batched pass and scored exactly with matrix-matrix products
+        (in blocks of `block_size` queries to bound memory), then top-k is taken per row.
+        `filters` works as in `search` and applies to every query.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        self._check_corpus_version()
+        query_embeddings = self.embed_queries(queries)
+        query_matrix = self.query_vectorizer.transform(queries)
+        segments = self.segments
+
+        all_results = []
+        for start in range(0, len(queries), block_size):
+            block = slice(start, start + block_size)
+            lexical_scores = [seg.lexical_index.score_many(query_matrix[block]) for seg in segments]
+            if segments[0].lexical_index.normalize_scores:
+                row_max = np.max([scores.max(axis=1, initial=0) for scores in lexical_scores], axis=0)[:, None]
+                lexical_scores = [np.divide(scores, row_max, out=scores, where=row_max > 0) for scores in lexical_scores]
+
+            block_hits = [[] for _ in range(len(query_embeddings[block]))]
+            for seg, seg_lexical in zip(segments, lexical_scores):
+                top, top_scores = seg.search_many(query_embeddings[block], seg_lexical, top_k, self.alpha,
+                                                  self.rerank_depth, filters)
+                for row_hits, ids, scores in zip(block_hits, top, top_scores):
+                    row_hits.extend((score, seg, idx) for idx, score in zip(ids, scores) if np.isfinite(score))
+            for row_hits in block_hits:
+                row_hits.sort(key=lambda hit: -hit[0])
+                all_results.append(self._build_results(row_hits[:top_k]))
+        return all_results
+
+    def add_papers(self, papers, embeddings=None):
+        """Append papers as a new segment and return their doc ids.
+
+        `papers` is a DataFrame (or list of dicts) with at least title and abstract. Embeddings are
+        encoded with the engine's model unless given. New text is vectorized with the already-fitted
+        vocabulary, so nothing is refit and queries keep being served while this runs.
+        """
+        df = pd.DataFrame(papers)
+        if not len(df):
+            return np.empty(0, dtype=np.int64)
+        df['text'] = df['title'].fillna('') + ". " + df['abstract'].fillna('')
+        if embeddings is None:
+            embeddings = self.model.encode(df['text'].tolist())
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+        base_lexical = self.segments[0].lexical_index
+        if base_lexical.bm25_stats is not None:
+            lexical_index = InvertedIndex.from_bm25(self.query_vectorizer.transform(df['text']),
+                                                    stats=base_lexical.bm25_stats)
+        else:
+            lexical_index = InvertedIndex.from_tfidf(self.vectorizer.transform(df['text']))
+
+        with self._write_lock:
+            columns = {name: (df[name] if name in df else pd.Series([''] * len(df))).to_numpy(dtype=object)
+                       for name in self.segments[0].columns}
+            doc_ids = np.arange(self.next_doc_id, self.next_doc_id + len(df), dtype=np.int64)
+            self.next_doc_id += len(df)
+            self.segments = self.segments + [Segment(embeddings, lexical_index, columns, doc_ids)]
+            self.generation += 1
+            too_many_segments = len(self.segments) > self.max_segments
+
+        if too_many_segments:
+            self.merge_segments(background=True)
+        return doc_ids
+
+    def delete_papers(self, doc_ids):
+        """Tombstone papers by doc id; they stop matching immediately and are dropped on the next merge."""
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        with self._write_lock:
+            deleted = 0
+            for seg in self.segments:
+                hit = np.isin(seg.doc_ids, doc_ids) & ~seg.deleted
+                seg.deleted |= hit
+                deleted += int(hit.sum())
+            self.generation += 1
+        return deleted
+
+    def merge_segments(self, background=False):
+        """Fold all segments into one (dropping tombstones); with background=True this runs in a thread."""
+        if background:
+            if self._merge_thread is None or not self._merge_thread.is_alive():
+                self._merge_thread = threading.Thread(target=self.merge_segments, daemon=True)
+                self._merge_thread.start()
+            return self._merge_thread
+
+        with self._merge_lock:
+            with self._write_lock:
+                snapshot = list(self.segments)
+                deleted_before = [seg.deleted.copy() for seg in snapshot]
+            if len(snapshot) == 1 and not snapshot[0].deleted.any():
+                return None
+
+            # The expensive part runs without the write lock, so queries and new updates are not blocked
+            merged = Segment.merge(snapshot)
+
+            with self._write_lock:
+                # Re-apply deletes that arrived while merging, and keep segments added meanwhile
+                for seg, before in zip(snapshot, deleted_before):
+                    late = seg.doc_ids[seg.deleted & ~before]
+                    if len(late):
+                        merged.deleted |= np.isin(merged.doc_ids, late)
+                self.segments = [merged] + self.segments[len(snapshot):]
+                self.generation += 1
+        return None
+
+    def _build_results(self, hits):
+        """Materialise hits with one column take per segment instead of one lookup per field per hit."""
+        results = [None] * len(hits)
+        by_segment = {}
+        for rank, (score, seg, idx) in enumerate(hits):
+            by_segment.setdefault(id(seg), (seg, [], []))
+            by_segment[id(seg)][1].append(rank)
+            by_segment[id(seg)][2].append(idx)
+
+        for seg, ranks, ids in by_segment.values():
+            ids = np.asarray(ids, dtype=np.int64)
+            titles = seg.columns['title'].take(ids)
+            abstracts = seg.columns['abstract'].take(ids)
+            authors = seg.columns['authors'].take(ids) if 'authors' in seg.columns else ['N/A'] * len(ids)
+            doc_ids = seg.doc_ids[ids].tolist()
+            for rank, title, abstract, author, doc_id in zip(ranks, titles, abstracts, authors, doc_ids):
+                results[rank] = {
+                    'title': title,
+                    'abstract': abstract,
+                    'score': hits[rank][0],
+                    'authors': author,
+                    'doc_id': doc_id,
+                }
         return results
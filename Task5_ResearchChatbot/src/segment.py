@@ -0,0 +1,186 @@
+import numpy as np
+import scipy.sparse as sp
+from src.ann_index import IVFIndex
+from src.lexical_index import InvertedIndex
+from src.metadata_filter import FilterIndex
+from src.quantization import QuantizedEmbeddings
+
+
+class Segment:
+    """One independently searchable slice of the corpus.
+
+    The engine starts with a single segment holding the whole corpus; `add_papers` appends
+    small segments and `merge_segments` folds them back together. Segments are never changed
+    in place except for `deleted` (tombstones), so queries can keep reading a snapshot of the
+    segment list while updates and merges run.
+    """
+
+    def __init__(self, embeddings, lexical_index, columns, doc_ids, ann_index=None, quantized=None):
+        self.embeddings = embeddings
+        self.lexical_index = lexical_index
+        self.columns = columns
+        self.doc_ids = doc_ids
+        self.ann_index = ann_index
+        self.quantized = quantized
+        self.deleted = np.zeros(len(embeddings), dtype=bool)
+        self.filter_index = FilterIndex(columns)
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    @property
+    def live_count(self):
+        return len(self) - int(self.deleted.sum())
+
+    def excluded(self, filters=None):
+        """Rows that must never be returned: tombstones, plus everything the filters reject."""
+        if not filters:
+            return self.deleted
+        return self.deleted | ~self.filter_index.mask(filters)
+
+    def score_rows(self, ids, query_vec, query_emb, top_k, alpha, lexical_norm=None):
+        """Exact fused top-k over the given (sorted) rows only; used when a filter leaves few rows."""
+        sem_scores = self.embeddings[ids] @ query_emb
+        tfidf_scores = self.lexical_index.score(ids, query_vec.indices, query_vec.data)
+        if lexical_norm:
+            tfidf_scores = tfidf_scores / lexical_norm
+        combined_scores = alpha * tfidf_scores + (1 - alpha) * sem_scores
+        if len(ids) > top_k:
+            top = np.argpartition(-combined_scores, top_k - 1)[:top_k]
+            ids, combined_scores = ids[top], combined_scores[top]
+        order = np.argsort(-combined_scores)
+        return ids[order], combined_scores[order]
+
+    def semantic_candidates(self, query_emb, depth, rerank_depth):
+        """Top-`depth` (ids, scores) by cosine similarity, via the IVF index when enabled."""
+        if self.ann_index is not None:
+            return self.ann_index.search(query_emb, self.embeddings, k=depth)
+
+        if self.quantized is not None:
+            return self.rerank(query_emb, self.quantized.scores(query_emb[None, :])[0], depth, rerank_depth)
+
+        sem_scores = self.embeddings @ query_emb
+        if len(sem_scores) > depth:
+            top = np.argpartition(-sem_scores, depth - 1)[:depth]
+            return top, sem_scores[top]
+        return np.arange(len(sem_scores)), sem_scores
+
+    def rerank(self, query_emb, approx_scores, depth, rerank_depth):
+        """Re-score the best `rerank_depth` approximate hits exactly and keep the top `depth`."""
+        n_rerank = min(max(depth, rerank_depth), len(approx_scores))
+        ids = np.sort(np.argpartition(-approx_scores, n_rerank - 1)[:n_rerank])
+        exact = self.embeddings[ids] @ query_emb
+        if len(ids) > depth:
+            top = np.argpartition(-exact, depth - 1)[:depth]
+            ids, exact = ids[top], exact[top]
+        return ids, exact
+
+    def search(self, query_vec, query_emb, top_k, alpha, candidate_depth, rerank_depth, lexical_norm=None,
+               filters=None):
+        """Fused top-k (local ids, scores) within this segment; tombstoned and filtered-out papers never match."""
+        n_docs = len(self)
+        if not n_docs:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        depth = max(candidate_depth, top_k)
+
+        excluded = self.excluded(filters)
+        if filters:
+            # A selective filter is cheaper to score row by row than to search the whole segment. Without an
+            # ANN index or quantized copy that holds up to about half of the segment.
+            allowed_ids = np.flatnonzero(~excluded)
+            exact_limit = n_docs // 2 if self.ann_index is None and self.quantized is None else n_docs // 8
+            if len(allowed_ids) <= max(depth, exact_limit):
+                return self.score_rows(allowed_ids, query_vec, query_emb, top_k, alpha, lexical_norm)
+
+        while True:
+            # Lexical candidates come from the posting lists of the query terms only
+            lexical_ids, lexical_scores = self.lexical_index.top_k(query_vec.indices, query_vec.data, k=depth)
+            semantic_ids, semantic_scores = self.semantic_candidates(query_emb, depth, rerank_depth)
+
+            # Score the fused candidate set exactly on both sides
+            candidate_ids = np.union1d(lexical_ids, semantic_ids)
+            sem_scores = self.embeddings[candidate_ids] @ query_emb
+            tfidf_scores = self.lexical_index.score(candidate_ids, query_vec.indices, query_vec.data)
+            lexical_bound = lexical_scores[-1] if len(lexical_ids) == depth else 0.0
+            if lexical_norm:
+                tfidf_scores = tfidf_scores / lexical_norm
+                lexical_bound = lexical_bound / lexical_norm
+
+            # Combine with weighted sum using alpha
+            combined_scores = alpha * tfidf_scores + (1 - alpha) * sem_scores
+            combined_scores[excluded[candidate_ids]] = -np.inf
+
+            # A paper outside both candidate lists scores at most `bound`; widen until it can't compete
+            bound = alpha * lexical_bound + (1 - alpha) * semantic_scores.min()
+            kth_best = np.sort(combined_scores)[-min(top_k, len(combined_scores))] if len(combined_scores) else 0.0
+            if kth_best >= bound or depth >= n_docs or len(semantic_ids) < depth:
+                break
+            depth *= 4
+
+        top = np.argsort(-combined_scores)[:top_k]
+        top = top[np.isfinite(combined_scores[top])]
+        return candidate_ids[top], combined_scores[top]
+
+    def search_many(self, query_embs, lexical_scores, top_k, alpha, rerank_depth, filters=None):
+        """Per-row top-k (local ids, scores) for a block of queries; tombstoned and filtered-out rows score -inf."""
+        excluded = self.excluded(filters)
+        allowed_ids = np.flatnonzero(~excluded) if filters else None
+        if not len(self) or (allowed_ids is not None and not len(allowed_ids)):
+            empty = np.empty((len(query_embs), 0))
+            return empty.astype(np.int64), empty
+
+        if allowed_ids is not None and len(allowed_ids) <= len(self) // 8:
+            # Selective filter: score only the allowed columns
+            combined_scores = (alpha * lexical_scores[:, allowed_ids]
+                               + (1 - alpha) * (query_embs @ self.embeddings[allowed_ids].T))
+            k = min(top_k, len(allowed_ids))
+            top = np.argpartition(-combined_scores, k - 1, axis=1)[:, :k]
+            return allowed_ids[top], np.take_along_axis(combined_scores, top, axis=1)
+
+        if self.quantized is not None:
+            sem_scores = self.quantized.scores(query_embs)
+        else:
+            sem_scores = query_embs @ self.embeddings.T
+
+        # Combine with weighted sum using alpha
+        combined_scores = alpha * lexical_scores + (1 - alpha) * sem_scores
+        combined_scores[:, excluded] = -np.inf
+
+        # Per-row top-k without sorting every row
+        k = min(top_k, combined_scores.shape[1])
+        if self.quantized is not None:
+            # Approximate semantic scores: re-score the best rerank_depth hits per row exactly
+            n_rerank = min(max(k, rerank_depth), combined_scores.shape[1])
+            top = np.argpartition(-combined_scores, n_rerank - 1, axis=1)[:, :n_rerank]
+            exact_sem = np.stack([self.embeddings[ids] @ q for q, ids in zip(query_embs, top)])
+            top_scores = alpha * np.take_along_axis(lexical_scores, top, axis=1) + (1 - alpha) * exact_sem
+            top_scores[excluded[top]] = -np.inf
+            best = np.argpartition(-top_scores, k - 1, axis=1)[:, :k]
+            top, top_scores = np.take_along_axis(top, best, axis=1), np.take_along_axis(top_scores, best, axis=1)
+        else:
+            top = np.argpartition(-combined_scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(combined_scores, top, axis=1)
+        return top, top_scores
+
+    @classmethod
+    def merge(cls, segments):
+        """Fold segments into one, dropping tombstoned rows; no vectorizer refit and no k-means."""
+        live = [np.flatnonzero(~seg.deleted) for seg in segments]
+        embeddings = np.concatenate([np.asarray(seg.embeddings[ids], dtype=np.float32)
+                                     for seg, ids in zip(segments, live)])
+        doc_term = sp.vstack([sp.csr_matrix(seg.lexical_index.doc_term_matrix())[ids]
+                              for seg, ids in zip(segments, live)])
+        base_lexical = segments[0].lexical_index
+        lexical_index = InvertedIndex(doc_term, normalize_scores=base_lexical.normalize_scores)
+        lexical_index.bm25_stats = base_lexical.bm25_stats
+        # NumPy columns and bundle StringColumns both support take()
+        columns = {name: np.concatenate([seg.columns[name].take(ids) for seg, ids in zip(segments, live)])
+                   for name in segments[0].columns}
+        doc_ids = np.concatenate([seg.doc_ids[ids] for seg, ids in zip(segments, live)])
+
+        base = segments[0]
+        ann_index = None
+        if base.ann_index is not None:
+            ann_index = IVFIndex.from_centroids(base.ann_index.centroids, embeddings, nprobe=base.ann_index.nprobe)
+        quantized = QuantizedEmbeddings.quantize(embeddings, base.quantized.mode) if base.quantized is not None else None
+        return cls(embeddings, lexical_index, columns, doc_ids, ann_index=ann_index, quantized=quantized)
@@ -0,0 +1 @@
+"""Code shared by several tasks. Each task adds the repository root to `sys.path` to import it."""
@@ -0,0 +1,228 @@
+"""Shared SentenceTransformer encoder with dynamic micro-batching.
+
+Concurrent `encode` calls are queued and coalesced: the worker takes the first request, then
+keeps adding requests until `max_batch_size` texts are collected or `max_wait_ms` has passed,
+and runs a single forward pass for all of them.
+
+In-process (default): `get_encoder(model_name)` loads the model once per process and every
+caller (Streamlit sessions, search engines, ...) shares it.
+
+Across processes/apps: start one server (from the repository root) and point the apps at its
+Unix socket.
+
+    python -m shared.embedding_service --socket /tmp/minilm.sock
+    EMBEDDING_SERVICE_SOCKET=/tmp/minilm.sock streamlit run app.py
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+SOCKET_ENV = "EMBEDDING_SERVICE_SOCKET"
+
+
+def canonical_model_name(model_name):
+    """'sentence-transformers/all-MiniLM-L6-v2' and 'all-MiniLM-L6-v2' are the same model."""
+    return model_name.split('/', 1)[1] if model_name.startswith('sentence-transformers/') else model_name
+
+
+class MicroBatchEncoder:
+    """Wraps a model's `encode` and merges concurrent calls into micro-batches."""
+
+    def __init__(self, model, max_batch_size=64, max_wait_ms=5.0):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.n_batches = self.n_requests = self.n_texts = 0
+        self.last_batch_requests = 0
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def encode(self, texts):
+        """Embeddings for a text or a list of texts; forward-pass batching is the worker's job."""
+        single = isinstance(texts, str)
+        future = Future()
+        self.requests.put(([texts] if single else list(texts), future))
+        embeddings = future.result()
+        return embeddings[0] if single else embeddings
+
+    def _run(self):
+        while True:
+            batch = [self.requests.get()]
+            n_texts = len(batch[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            # A lone request under light load (nothing queued, last batch also alone) runs right away;
+            # otherwise keep collecting until the batch is full or the oldest request has waited max_wait
+            idle = self.last_batch_requests <= 1 and self.requests.empty()
+            while not idle and n_texts < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                n_texts += len(request[0])
+
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                # Coalesced queries fit in one forward pass; one large bulk request is still split up
+                embeddings = np.asarray(self.model.encode(texts, batch_size=self.max_batch_size), dtype=np.float32)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for request_texts, future in batch:
+                future.set_result(embeddings[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+            self.last_batch_requests = len(batch)
+            self.n_batches += 1
+            self.n_requests += len(batch)
+            self.n_texts += len(texts)
+
+    def stats(self):
+        return {'batches': self.n_batches, 'requests': self.n_requests, 'texts': self.n_texts,
+                'mean_batch_size': self.n_texts / self.n_batches if self.n_batches else 0.0}
+
+
+# -------------------- Unix socket protocol --------------------
+# Each message is a 4-byte big-endian length followed by that many bytes.
+# Request: JSON {"model", "texts"}. Response: JSON header {"shape"} or {"error"}, then raw float32 data.
+
+def _send(sock, payload):
+    sock.sendall(struct.pack('>I', len(payload)) + payload)
+
+
+def _recv_exactly(sock, n):
+    data = bytearray()
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise ConnectionError("embedding service closed the connection")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def _recv(sock):
+    (length,) = struct.unpack('>I', _recv_exactly(sock, 4))
+    return _recv_exactly(sock, length)
+
+
+class RemoteEncoder:
+    """Client for the socket server; same `encode` interface as a SentenceTransformer."""
+
+    def __init__(self, socket_path, model_name):
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self.local = threading.local()  # one connection per thread
+
+    def _connection(self):
+        if getattr(self.local, 'sock', None) is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.socket_path)
+            self.local.sock = sock
+        return self.local.sock
+
+    def encode(self, texts):
+        single = isinstance(texts, str)
+        request = json.dumps({'model': self.model_name, 'texts': [texts] if single else list(texts)})
+        sock = self._connection()
+        try:
+            _send(sock, request.encode('utf-8'))
+            header = json.loads(_recv(sock))
+            if 'error' not in header:
+                embeddings = np.frombuffer(_recv(sock), dtype=np.float32).reshape(header['shape'])
+        except (OSError, ConnectionError):
+            self.local.sock = None
+            raise
+        if 'error' in header:
+            raise RuntimeError(f"Embedding service error: {header['error']}")
+        return embeddings[0] if single else embeddings
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def _send_error(self, message):
+        _send(self.request, json.dumps({'error': message}).encode('utf-8'))
+
+    def handle(self):
+        while True:
+            try:
+                request = json.loads(_recv(self.request))
+            except ConnectionError:
+                return
+            if canonical_model_name(request['model']) != self.server.model_name:
+                self._send_error(f"serving {self.server.model_name}, not {request['model']}")
+                continue
+            try:
+                embeddings = self.server.encoder.encode(request['texts'])
+            except Exception as e:
+                # Report it to the client and keep the connection, instead of killing this handler thread
+                self._send_error(f"{type(e).__name__}: {e}")
+                continue
+            _send(self.request, json.dumps({'shape': list(embeddings.shape)}).encode('utf-8'))
+            _send(self.request, np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, model_name, max_batch_size=64, max_wait_ms=5.0, model=None):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, _Handler)
+        self.model_name = canonical_model_name(model_name)
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name)
+        self.encoder = MicroBatchEncoder(model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+
+# -------------------- Shared instances --------------------
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def get_encoder(model_name, max_batch_size=64, max_wait_ms=5.0):
+    """The process-wide encoder for `model_name`: the socket service if configured, else a local model."""
+    key = canonical_model_name(model_name)
+    with _encoders_lock:
+        if key not in _encoders:
+            socket_path = os.getenv(SOCKET_ENV)
+            if socket_path:
+                _encoders[key] = RemoteEncoder(socket_path, model_name)
+            else:
+                from sentence_transformers import SentenceTransformer
+                _encoders[key] = MicroBatchEncoder(SentenceTransformer(model_name), max_batch_size=max_batch_size,
+                                                   max_wait_ms=max_wait_ms)
+        return _encoders[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default="/tmp/minilm.sock")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    server = EmbeddingServer(args.socket, args.model, max_batch_size=args.max_batch_size,
+                             max_wait_ms=args.max_wait_ms)
+    print(f"✅ Serving {args.model} on {args.socket} (batch ≤ {args.max_batch_size}, wait ≤ {args.max_wait_ms} ms)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
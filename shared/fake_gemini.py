@@ -0,0 +1,44 @@
+import itertools
+import time
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Offline stand-in for `genai.GenerativeModel` that replays canned responses.
+
+    `responses` are returned in turn (cycling); with none, the model answers with a short text
+    that echoes the prompt. With `stream=True` the text is yielded in chunks of
+    `chunk_words` words after `first_token_delay`, then one chunk every `chunk_delay` seconds,
+    like a real streaming call. Set FAKE_GEMINI=1 to run the Task 2 and Task 3 apps without an API key.
+    """
+
+    def __init__(self, responses=None, chunk_words=4, first_token_delay=0.3, chunk_delay=0.05):
+        self.responses = itertools.cycle(responses) if responses else None
+        self.chunk_words = chunk_words
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+
+    def _text_for(self, contents):
+        if self.responses is not None:
+            return next(self.responses)
+        prompt = contents if isinstance(contents, str) else " ".join(c for c in contents if isinstance(c, str))
+        return f"(offline answer) You asked: {prompt.strip()[-200:]}"
+
+    def _chunks(self, text):
+        words = text.split(" ")
+        time.sleep(self.first_token_delay)
+        for i in range(0, len(words), self.chunk_words):
+            if i:
+                time.sleep(self.chunk_delay)
+            yield FakeChunk(" ".join(words[i:i + self.chunk_words]) + (" " if i + self.chunk_words < len(words) else ""))
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        text = self._text_for(contents)
+        if stream:
+            return self._chunks(text)
+        chunks = list(self._chunks(text))
+        return FakeChunk("".join(c.text for c in chunks))